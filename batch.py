@@ -0,0 +1,195 @@
+import functools
+import os
+import sys
+import threading
+import subprocess
+
+def _block_device(path):
+    """
+    Linux: sysfs folder of the whole disk holding path (the parent disk for a
+    partition, e.g. /sys/devices/.../block/sda for sda2), or None if unknown.
+    """
+    try:
+        st_dev = os.stat(path).st_dev
+        device = os.path.realpath(f"/sys/dev/block/{os.major(st_dev)}:{os.minor(st_dev)}")
+    except (OSError, AttributeError):
+        return None
+    if not os.path.isdir(device):
+        # No block device (tmpfs, NFS, ...)
+        return None
+    if os.path.exists(os.path.join(device, "partition")):
+        return os.path.dirname(device)
+    return device
+
+@functools.lru_cache(maxsize=None)
+def _windows_disk_number(letter):
+    """ Windows: number of the physical disk behind a drive letter, or None """
+    cmd = f'powershell -Command "(Get-Partition -DriveLetter {letter}).DiskNumber"'
+    try:
+        res = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    number = res.stdout.strip()
+    return int(number) if number.isdigit() else None
+
+def disk_key(path):
+    """
+    Identifies the physical disk a folder lives on, used to throttle I/O.
+    Windows: the physical disk number behind the drive letter (C: and D: on one
+    disk share a key), else the drive letter or UNC share.
+    Elsewhere: the parent block device of the folder's volume, else its st_dev.
+    """
+    path = os.path.abspath(path)
+    if sys.platform.startswith('win'):
+        drive = os.path.splitdrive(path)[0].upper()
+        number = _windows_disk_number(drive[0]) if len(drive) == 2 else None
+        return f"disk{number}" if number is not None else drive
+    device = _block_device(path)
+    if device:
+        return device
+    try:
+        return os.stat(path).st_dev
+    except OSError:
+        return path
+
+def disk_is_rotational(path):
+    """
+    True for a spinning disk, False for SSD/NVMe, None if unknown.
+    Linux: queue/rotational of the parent block device.
+    Windows: MediaType of the physical disk behind the drive letter.
+    """
+    path = os.path.abspath(path)
+    if sys.platform.startswith('win'):
+        letter = os.path.splitdrive(path)[0].rstrip(':')
+        if len(letter) != 1:
+            return None
+        cmd = f'powershell -Command "(Get-Partition -DriveLetter {letter} | Get-Disk | Get-PhysicalDisk).MediaType"'
+        try:
+            res = subprocess.run(cmd, capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        media = res.stdout.strip().upper()
+        return {'HDD': True, 'SSD': False, 'SCM': False}.get(media)
+    device = _block_device(path)
+    if not device:
+        return None
+    try:
+        with open(os.path.join(device, "queue", "rotational")) as f:
+            return f.read().strip() == "1"
+    except OSError:
+        return None
+
+def default_per_disk(path):
+    """ Folders processed at once on the disk holding path: 1 unless it is known to be an SSD """
+    return BatchScheduler.SSD_PER_DISK if disk_is_rotational(path) is False else 1
+
+class BatchScheduler:
+    """
+    Processes married folders with up to max_in_flight folders at once, but never
+    more than per_disk folders on the same physical disk (parallel reads on one
+    spinning disk just thrash). Folders on different disks run in parallel.
+    per_disk=None picks it per disk: SSD_PER_DISK on SSDs, 1 on spinning or
+    unknown disks.
+    processor.max_workers is shared out across the folders in flight for the run.
+    Status updates go through on_status(index, text) from worker threads;
+    the GUI forwards them to Qt via signals.
+    """
+    # Folders at once on one SSD (no seek penalty; bounded by max_in_flight anyway)
+    SSD_PER_DISK = 4
+
+    def __init__(self, processor, max_in_flight=2, per_disk=None):
+        self.processor = processor
+        self.max_in_flight = max(1, max_in_flight)
+        self.per_disk = max(1, per_disk) if per_disk else None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        """ Stops dispatching new folders; folders in flight finish normally """
+        self._cancelled.set()
+
+    def run(self, folders, on_status=None, on_done=None):
+        """
+        folders = [{'path': ..., 'cue': ...}] (LibraryScanner results).
+        on_status(index, text) reports per-folder status; on_done(completed_count)
+        fires after each folder. Returns a list of generated file lists (None = failed),
+        in the order of folders.
+        """
+        results = [None] * len(folders)
+        if not folders:
+            return results
+        pending = list(range(len(folders)))
+        disks = [disk_key(folder['path']) for folder in folders]
+        limits = {}
+        for folder, disk in zip(folders, disks):
+            if disk not in limits:
+                limits[disk] = self.per_disk or default_per_disk(folder['path'])
+        active = {}
+        completed = [0]
+        lock = threading.Condition()
+        
+        def report(index, text):
+            if on_status:
+                on_status(index, text)
+        
+        def next_job():
+            # First pending folder whose disk still has a free slot
+            for pos, index in enumerate(pending):
+                if active.get(disks[index], 0) < limits[disks[index]]:
+                    return pending.pop(pos)
+            return None
+        
+        def worker():
+            while True:
+                with lock:
+                    index = None
+                    while not self._cancelled.is_set() and pending:
+                        index = next_job()
+                        if index is not None:
+                            break
+                        lock.wait()
+                    if index is None:
+                        return
+                    active[disks[index]] = active.get(disks[index], 0) + 1
+                
+                folder = folders[index]
+                cue_path = os.path.join(folder['path'], folder['cue'])
+                try:
+                    # Finished in an earlier run (job journal): nothing to redo
+                    settings = self.processor.image_job_settings(cue_path)
+                    finished = self.processor.journal.finished_outputs(cue_path, settings) if self.processor.resume else None
+                    if finished:
+                        results[index] = finished
+                        report(index, f"✓ {len(finished)} files (done earlier)")
+                    else:
+                        report(index, "Processing...")
+                        result = self.processor.process_iso_workflow(cue_path, folder['path'])
+                        results[index] = result or None
+                        report(index, f"✓ {len(result)} files" if result else "✗ Failed")
+                except Exception as e:
+                    report(index, f"✗ Error: {str(e)[:20]}")
+                
+                with lock:
+                    active[disks[index]] -= 1
+                    completed[0] += 1
+                    done_count = completed[0]
+                    lock.notify_all()
+                if on_done:
+                    on_done(done_count)
+        
+        for index in pending:
+            report(index, "Queued")
+        
+        in_flight = min(self.max_in_flight, len(folders))
+        # Each folder runs its own encoder pool: share the CPUs instead of oversubscribing them
+        max_workers = self.processor.max_workers
+        self.processor.max_workers = max(1, max_workers // in_flight)
+        try:
+            threads = [threading.Thread(target=worker, daemon=True) for _ in range(in_flight)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            self.processor.max_workers = max_workers
+        
+        return results
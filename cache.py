@@ -0,0 +1,194 @@
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+def read_flac_streaminfo(path):
+    """
+    Reads the FLAC STREAMINFO block without decoding.
+    Returns {'sample_rate', 'channels', 'bits_per_sample', 'total_samples', 'md5'} or None.
+    'md5' is the hex MD5 of the decoded PCM ('' if the encoder did not set it).
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(4 + 4 + 34)
+    except OSError:
+        return None
+    # "fLaC" + metadata block header (type 0 = STREAMINFO, length 34)
+    if len(header) < 42 or header[:4] != b'fLaC' or header[4] & 0x7F != 0:
+        return None
+    info = header[8:42]
+    packed = int.from_bytes(info[10:18], 'big')
+    md5 = info[18:34].hex()
+    return {
+        'sample_rate': packed >> 44,
+        'channels': ((packed >> 41) & 0x07) + 1,
+        'bits_per_sample': ((packed >> 36) & 0x1F) + 1,
+        'total_samples': packed & 0xFFFFFFFFF,
+        'md5': '' if md5 == '0' * 32 else md5
+    }
+
+def audio_content_hash(path, chunk_size=1024 * 1024):
+    """
+    Stable key for the audio content of a file.
+    FLAC: the STREAMINFO PCM MD5 + sample count (tags/retagging don't change it, no read
+    of the audio data). Other formats: BLAKE2b of the whole file.
+    """
+    info = read_flac_streaminfo(path)
+    if info and info['md5']:
+        return f"flac:{info['md5']}:{info['total_samples']}"
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk_size)
+            if not data:
+                break
+            digest.update(data)
+    return f"b2:{digest.hexdigest()}"
+
+class MetadataCache:
+    """
+    Persistent lookup cache (SQLite):
+      fingerprints: audio content hash -> (duration, fingerprint) + AcoustID result (MBID or miss)
+      recordings:   recording MBID -> metadata
+      discs:        MusicBrainz DiscID -> matching releases (or none)
+    Network results expire after ttl seconds (fingerprints are content-derived and
+    never expire). Each table is bounded to max_entries rows, evicting the least
+    recently used. WAL mode + one connection per thread make it safe to share
+    between worker threads and concurrent processes.
+    """
+    def __init__(self, db_path, ttl=90 * 24 * 3600, max_entries=200000):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self._writes = 0
+        self._writes_lock = threading.Lock()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fingerprints (
+                    content_hash TEXT PRIMARY KEY,
+                    duration REAL NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    mbid TEXT,
+                    looked_up REAL,
+                    accessed REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS recordings (
+                    mbid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS discs (
+                    discid TEXT PRIMARY KEY,
+                    data TEXT NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )""")
+            conn.execute("CREATE INDEX IF NOT EXISTS fingerprints_accessed ON fingerprints(accessed)")
+            conn.execute("CREATE INDEX IF NOT EXISTS recordings_accessed ON recordings(accessed)")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _fresh(self, timestamp):
+        return timestamp is not None and time.time() - timestamp < self.ttl
+
+    # --- Fingerprints ---
+    def get_fingerprint(self, content_hash):
+        """ Returns (duration, fingerprint) or None """
+        with self._conn() as conn:
+            row = conn.execute("SELECT duration, fingerprint FROM fingerprints WHERE content_hash = ?",
+                               (content_hash,)).fetchone()
+            if row:
+                conn.execute("UPDATE fingerprints SET accessed = ? WHERE content_hash = ?", (time.time(), content_hash))
+        return row
+
+    def put_fingerprint(self, content_hash, duration, fingerprint):
+        with self._conn() as conn:
+            conn.execute("""
+                INSERT INTO fingerprints (content_hash, duration, fingerprint, accessed) VALUES (?, ?, ?, ?)
+                ON CONFLICT(content_hash) DO UPDATE SET duration = excluded.duration,
+                    fingerprint = excluded.fingerprint, accessed = excluded.accessed""",
+                (content_hash, duration, fingerprint, time.time()))
+        self._wrote()
+
+    def get_acoustid(self, content_hash):
+        """
+        Cached AcoustID result: (True, mbid or None) if fresh, (False, None) if unknown/expired.
+        A cached miss (no match) is returned as (True, None).
+        """
+        with self._conn() as conn:
+            row = conn.execute("SELECT mbid, looked_up FROM fingerprints WHERE content_hash = ?",
+                               (content_hash,)).fetchone()
+        if row and self._fresh(row[1]):
+            return True, row[0]
+        return False, None
+
+    def put_acoustid(self, content_hash, mbid):
+        with self._conn() as conn:
+            conn.execute("UPDATE fingerprints SET mbid = ?, looked_up = ? WHERE content_hash = ?",
+                         (mbid, time.time(), content_hash))
+
+    # --- Recordings ---
+    def get_recording(self, mbid):
+        with self._conn() as conn:
+            row = conn.execute("SELECT data, created FROM recordings WHERE mbid = ?", (mbid,)).fetchone()
+            if not row or not self._fresh(row[1]):
+                return None
+            conn.execute("UPDATE recordings SET accessed = ? WHERE mbid = ?", (time.time(), mbid))
+        return json.loads(row[0])
+
+    def put_recording(self, mbid, metadata):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?)",
+                         (mbid, json.dumps(metadata), now, now))
+        self._wrote()
+
+    # --- Discs ---
+    def get_disc(self, discid):
+        """ Cached releases for a DiscID ([] = known miss), or None if unknown/expired """
+        with self._conn() as conn:
+            row = conn.execute("SELECT data, created FROM discs WHERE discid = ?", (discid,)).fetchone()
+            if not row or not self._fresh(row[1]):
+                return None
+            conn.execute("UPDATE discs SET accessed = ? WHERE discid = ?", (time.time(), discid))
+        return json.loads(row[0])
+
+    def put_disc(self, discid, releases):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO discs VALUES (?, ?, ?, ?)",
+                         (discid, json.dumps(releases), now, now))
+        self._wrote()
+
+    # --- Maintenance ---
+    def _wrote(self):
+        with self._writes_lock:
+            self._writes += 1
+            due = self._writes % 1000 == 0
+        if due:
+            self.prune()
+
+    def prune(self):
+        """ Drops expired lookups and evicts least recently used rows beyond max_entries """
+        with self._conn() as conn:
+            for table in ("recordings", "discs"):
+                conn.execute(f"DELETE FROM {table} WHERE created < ?", (time.time() - self.ttl,))
+            for table in ("fingerprints", "recordings", "discs"):
+                count = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                if count > self.max_entries:
+                    conn.execute(f"DELETE FROM {table} WHERE rowid IN "
+                                 f"(SELECT rowid FROM {table} ORDER BY accessed LIMIT ?)",
+                                 (count - self.max_entries,))
@@ -0,0 +1,242 @@
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import threading
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from processor import AudioProcessor
+from library import LibraryScanner, LibraryIndex
+
+IMAGE_EXTS = ('.cue', '.nrg', '.iso')
+AUDIO_EXTS = ('.flac', '.wav', '.mp3', '.m4a')
+
+class ProgressWriter:
+    """ Thread-safe JSON-lines event stream (one object per line, flushed) """
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def emit(self, event, **fields):
+        record = {"event": event, "time": round(time.time(), 3)}
+        record.update(fields)
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+def expand_inputs(patterns, scanner=None):
+    """
+    Inputs -> [(source_path, output_dir)] in a stable order, duplicates removed.
+    Directories contribute the CUE of every married folder below them.
+    """
+    items = []
+    seen = set()
+
+    def add(path, output_dir):
+        key = os.path.abspath(path)
+        if key not in seen:
+            seen.add(key)
+            items.append((path, output_dir))
+
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern, recursive=True)) if glob.has_magic(pattern) else [pattern]
+        for path in matches:
+            if os.path.isdir(path):
+                for folder in (scanner or LibraryScanner()).scan(path):
+                    add(os.path.join(folder['path'], folder['cue']), folder['path'])
+            elif path.lower().endswith(IMAGE_EXTS + AUDIO_EXTS) and os.path.isfile(path):
+                add(path, None)
+            else:
+                print(f"Skipping unsupported input: {path}", file=sys.stderr)
+    return items
+
+def process_one(processor, source_path, output_dir, args):
+    """ Runs the workflow for one input; returns the generated files """
+    output_dir = output_dir or args.output_dir or os.path.dirname(os.path.abspath(source_path))
+    os.makedirs(output_dir, exist_ok=True)
+    if source_path.lower().endswith(IMAGE_EXTS):
+        return processor.process_iso_workflow(source_path, output_dir, identify=args.identify)
+
+    # Audio file: silence detection + split (journaled like the GUI)
+    tracks = processor.detect_silence(source_path, db_threshold=args.db, min_duration=args.min_duration)
+    if not tracks:
+        raise RuntimeError("No silence detected. Try adjusting --db / --min-duration.")
+    outputs = processor.split_file(source_path, tracks, output_dir)
+    if outputs:
+        processor.journal.finish_job(source_path, outputs, job_settings(processor, source_path, args))
+    return outputs
+
+def job_settings(processor, source_path, args):
+    """ Journal settings of an input's job (see JobJournal.finished_outputs) """
+    if source_path.lower().endswith(IMAGE_EXTS):
+        return processor.image_job_settings(source_path, args.identify)
+    return processor.split_job_settings(args.db, args.min_duration)
+
+def run_items(processor, items, args, progress):
+    """ Processes items on a pool of args.parallel; returns {"processed", "skipped", "failed"} counts """
+    counts = {"processed": 0, "skipped": 0, "failed": 0}
+    counts_lock = threading.Lock()
+
+    def run(item):
+        source_path, output_dir = item
+        finished = (processor.journal.finished_outputs(source_path, job_settings(processor, source_path, args))
+                    if processor.resume else None)
+        if finished:
+            progress.emit("skipped", input=source_path, outputs=finished)
+            outcome = "skipped"
+        else:
+            progress.emit("start", input=source_path)
+            started = time.monotonic()
+            try:
+                outputs = process_one(processor, source_path, output_dir, args)
+                if outputs:
+                    progress.emit("done", input=source_path, outputs=outputs,
+                                  seconds=round(time.monotonic() - started, 3))
+                    outcome = "processed"
+                else:
+                    progress.emit("error", input=source_path, error="No output produced")
+                    outcome = "failed"
+            except Exception as e:
+                progress.emit("error", input=source_path, error=str(e))
+                outcome = "failed"
+        with counts_lock:
+            counts[outcome] += 1
+
+    with ThreadPoolExecutor(max_workers=max(1, args.parallel)) as pool:
+        list(pool.map(run, items))
+    return counts
+
+def make_processor(args):
+    processor = AudioProcessor()
+    if args.jobs:
+        processor.max_workers = args.jobs
+    processor.replaygain = args.replaygain
+    processor.resume = not args.no_resume
+    processor.scratch_dir = args.scratch_dir
+    if args.scratch_limit:
+        processor.sacd_scratch_limit = int(args.scratch_limit * 1024 ** 3)
+    processor.sacd_pcm_rate = args.sacd_rate
+    processor.sacd_bit_depth = args.sacd_bits
+    return processor
+
+def cmd_process(args, progress):
+    processor = make_processor(args)
+    items = expand_inputs(args.inputs)
+    progress.emit("queued", count=len(items), inputs=[source for source, _ in items])
+    started = time.monotonic()
+    counts = run_items(processor, items, args, progress)
+    progress.emit("summary", seconds=round(time.monotonic() - started, 3), **counts)
+    return 1 if counts["failed"] else 0
+
+def input_signature(path):
+    """
+    (name, size, mtime) of a file, or of every file in a folder.
+    Unchanged between two polls = the copy into the watch folder has finished.
+    """
+    try:
+        if not os.path.isdir(path):
+            st = os.stat(path)
+            return ((os.path.basename(path), st.st_size, st.st_mtime_ns),)
+        with os.scandir(path) as it:
+            return tuple(sorted((e.name, e.stat().st_size, e.stat().st_mtime_ns) for e in it if e.is_file()))
+    except OSError:
+        return None
+
+def watch_candidates(roots, scanner):
+    """
+    Married CUE folders below the roots + NRG/ISO images dropped directly in a root.
+    Loose audio files are not picked up: extracted tracks land in the watched
+    folders too and would be split again.
+    """
+    items = []
+    for root in roots:
+        for folder in scanner.scan(root):
+            items.append((os.path.join(folder['path'], folder['cue']), folder['path'], folder['path']))
+        try:
+            with os.scandir(root) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.lower().endswith(('.nrg', '.iso')):
+                        items.append((entry.path, None, entry.path))
+        except OSError:
+            pass
+    return items
+
+def cmd_watch(args, progress):
+    """
+    Polls the watched folders every --interval seconds. A new input is processed
+    once its files are unchanged for one full interval (copy finished); the job
+    journal keeps finished inputs from running again, also across restarts.
+    """
+    processor = make_processor(args)
+    scanner = LibraryScanner(index=LibraryIndex())
+    pending = {}   # source_path -> last signature
+    handled = set()
+    progress.emit("watching", roots=args.dirs, interval=args.interval)
+    try:
+        while True:
+            ready = []
+            for source_path, output_dir, watched in watch_candidates(args.dirs, scanner):
+                if source_path in handled:
+                    continue
+                signature = input_signature(watched)
+                if signature is not None and pending.get(source_path) == signature:
+                    ready.append((source_path, output_dir))
+                    handled.add(source_path)
+                    pending.pop(source_path, None)
+                else:
+                    pending[source_path] = signature
+            if ready:
+                counts = run_items(processor, ready, args, progress)
+                progress.emit("summary", **counts)
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        progress.emit("stopped")
+    return 0
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="AutoSplitTagger headless processing (no GUI). Progress is written to stdout "
+                    "as JSON lines, logs go to stderr.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--jobs", type=int, default=None, help="Encoder workers per disc (default: CPU count)")
+    common.add_argument("--parallel", type=int, default=1, help="Inputs processed at once (default: 1)")
+    common.add_argument("--identify", action="store_true", help="Tag NRG/CUE output from MusicBrainz (DiscID, then fingerprints)")
+    common.add_argument("--replaygain", action="store_true", help="Write ReplayGain track/album tags")
+    common.add_argument("--no-resume", action="store_true", help="Redo inputs/tracks the job journal has as finished")
+    common.add_argument("--scratch-dir", default=None, help="Fast disk for intermediate SACD files (default: system temp dir)")
+    common.add_argument("--scratch-limit", type=float, default=None,
+                        help="SACD: extract track by track, keeping at most this many GB of DSF in scratch")
+    common.add_argument("--sacd-rate", type=int, default=None, choices=AudioProcessor.SACD_PCM_RATES,
+                        help="SACD: FLAC sample rate (default: ffmpeg's DSD/8 rate)")
+    common.add_argument("--sacd-bits", type=int, default=None, choices=AudioProcessor.SACD_BIT_DEPTHS,
+                        help="SACD: FLAC bit depth (default: ffmpeg's choice)")
+    common.add_argument("--db", type=float, default=-25.0, help="Silence threshold in dB for audio files (default: -25)")
+    common.add_argument("--min-duration", type=float, default=0.5, help="Minimum silence in seconds (default: 0.5)")
+
+    sub = parser.add_subparsers(dest="command", required=True)
+    process = sub.add_parser("process", parents=[common], help="Process files, globs or library folders")
+    process.add_argument("inputs", nargs="+",
+                         help="Disc images (.cue/.nrg/.iso), audio files, globs, or folders to scan for CUE + source")
+    process.add_argument("--output-dir", default=None, help="Output folder for file inputs (default: next to the input)")
+    watch = sub.add_parser("watch", parents=[common], help="Watch folders and process new inputs")
+    watch.add_argument("dirs", nargs="+")
+    watch.add_argument("--interval", type=float, default=30.0, help="Seconds between polls (default: 30)")
+    watch.set_defaults(output_dir=None)
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    progress = ProgressWriter(sys.stdout)
+    # Processor logs are print()s: keep stdout for the JSON-lines stream
+    with contextlib.redirect_stdout(sys.stderr):
+        if args.command == "process":
+            return cmd_process(args, progress)
+        return cmd_watch(args, progress)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+import os
+import codecs
+import threading
+import unicodedata
+from collections import namedtuple
+
+FRAMES_PER_SECOND = 75      # CD frames (sectors) per second; CUE times are MM:SS:FF
+
+class CueError(ValueError):
+    """ Malformed CUE sheet (message carries the line number) """
+
+_CueTrackBase = namedtuple('CueTrack', ['number', 'type', 'file_index', 'index0', 'index1', 'end',
+                                        'pregap', 'postgap', 'title', 'performer', 'isrc', 'start'])
+
+class CueTrack(_CueTrackBase):
+    """
+    One TRACK of a CueSheet. Positions are integer CD frames from the start of
+    the track's FILE (files[file_index]):
+      index0  INDEX 00 (start of the gap) if it is in the same FILE, else None
+      index1  INDEX 01 (start of the track; DiscIDs use it)
+      end     next track's INDEX 01 in the same FILE, None = end of the file
+              (gaps stay with the preceding track, like the old parser)
+      start   where extraction starts: index1, or index0 when the gap opens a
+              later FILE (no preceding track in that FILE to keep it)
+      pregap/postgap  PREGAP/POSTGAP silence that is not in the file
+    """
+    __slots__ = ()
+
+    @property
+    def start_seconds(self):
+        return self.start / FRAMES_PER_SECOND
+
+    @property
+    def end_seconds(self):
+        return None if self.end is None else self.end / FRAMES_PER_SECOND
+
+def parse_frames(timestamp):
+    """ 'MM:SS:FF' -> CD frames (int). Raises ValueError """
+    if timestamp[-3:-2] == ':' and timestamp[-6:-5] == ':' and timestamp.count(':') == 2 and len(timestamp) > 7:
+        # Fixed-width SS and FF: a single int() for all three fields
+        value = int(timestamp.replace(':', ''))
+        m, s, f = value // 10000, value // 100 % 100, value % 100
+    else:
+        m, s, f = map(int, timestamp.split(':'))
+    if m < 0 or s >= 60 or f >= FRAMES_PER_SECOND or s < 0 or f < 0:
+        raise ValueError(f"Bad CUE time: {timestamp}")
+    return (m * 60 + s) * FRAMES_PER_SECOND + f
+
+def _string(rest):
+    """ Value of a string field: quoted ("A \"B\" C" keeps inner quotes) or bare """
+    if rest[:1] == '"':
+        end = rest.rfind('"')
+        return rest[1:end] if end > 0 else rest[1:]
+    return rest.strip()
+
+# CP1258 bytes that CP1252 reads as other letters
+CP1258_TONE_MARKS = frozenset(b'\xcc\xd2\xde\xec\xf2')   # combining grave, hook, tilde, acute, dot below
+CP1258_BREVE_HORN = frozenset(b'\xc3\xe3\xd5\xf5')       # Ăă Ơơ (CP1252: Ãã Õõ, as in Portuguese ão/õe)
+CP1258_D_STROKE = frozenset(b'\xd0\xf0')                   # Đđ (CP1252: Ðð)
+CP1258_U_HORN = frozenset(b'\xdd\xfd')                     # Ưư (CP1252: Ýý)
+CP1258_UNDEFINED = frozenset(b'\x8a\x8e\x9a\x9e')          # CP1252 Š Ž š ž
+# Base vowels a tone mark can follow: ASCII + Ââ Êê Ôô Ăă Ơơ Ưư
+VIETNAMESE_VOWELS = frozenset(b'aeiouyAEIOUY\xc2\xe2\xca\xea\xd4\xf4\xc3\xe3\xd5\xf5\xdd\xfd')
+ASCII_LETTERS = frozenset(b'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+
+def _vietnamese_score(data):
+    """
+    (Vietnamese, Western) evidence from the bytes where CP1258 and CP1252 differ.
+    Vietnamese: a tone mark after a vowel, Đđ starting a word, Ưư, Ăă/Ơơ before a
+    consonant or tone mark. Western: a tone mark byte after anything else (Italian
+    ò, ì), Ðð inside a word (Icelandic), Ãã/Õõ before o/e (Portuguese ão, ões),
+    bytes CP1258 leaves undefined. Letters both codepages share (à á ô ú ...) count
+    for neither.
+    """
+    vietnamese = western = 0
+    previous = 0
+    size = len(data)
+    for i, byte in enumerate(data):
+        if byte >= 0x80:
+            if byte in CP1258_TONE_MARKS:
+                if previous in VIETNAMESE_VOWELS:
+                    vietnamese += 1
+                else:
+                    western += 1
+            elif byte in CP1258_U_HORN:
+                vietnamese += 1
+            elif byte in CP1258_D_STROKE:
+                if previous in ASCII_LETTERS:
+                    western += 1
+                else:
+                    vietnamese += 1
+            elif byte in CP1258_BREVE_HORN and i + 1 < size:
+                following = data[i + 1]
+                if following in b'oeOE':
+                    western += 1
+                elif following in ASCII_LETTERS or following in CP1258_TONE_MARKS:
+                    vietnamese += 1
+            elif byte in CP1258_UNDEFINED:
+                western += 1
+        previous = byte
+    return vietnamese, western
+
+def decode_cue(data, encoding=None):
+    """
+    CUE bytes -> (text, encoding).
+    BOM (UTF-8/16/32) first, then UTF-16 without BOM (NUL bytes), strict UTF-8, and
+    for legacy codepages CP1258 (Vietnamese: base letters + combining tone marks,
+    normalized to NFC) when its specific bytes read as Vietnamese, else CP1252.
+    encoding forces a codec.
+    """
+    if encoding:
+        return data.decode(encoding, errors='replace'), encoding
+    for bom, codec in ((codecs.BOM_UTF8, 'utf-8-sig'), (codecs.BOM_UTF32_LE, 'utf-32'),
+                       (codecs.BOM_UTF32_BE, 'utf-32'), (codecs.BOM_UTF16_LE, 'utf-16'),
+                       (codecs.BOM_UTF16_BE, 'utf-16')):
+        if data.startswith(bom):
+            return data.decode(codec, errors='replace'), codec
+    head = data[:4096]
+    if b'\x00' in head:
+        # ASCII keywords in UTF-16: the zero byte is the high byte of every character
+        codec = 'utf-16-be' if head[0::2].count(0) > head[1::2].count(0) else 'utf-16-le'
+        return data.decode(codec, errors='replace'), codec
+    try:
+        return data.decode('utf-8'), 'utf-8'
+    except UnicodeDecodeError:
+        pass
+    vietnamese, western = _vietnamese_score(data)
+    if vietnamese > western:
+        return unicodedata.normalize('NFC', data.decode('cp1258', errors='replace')), 'cp1258'
+    return data.decode('cp1252', errors='replace'), 'cp1252'
+
+class CueSheet:
+    """
+    Single-pass CUE sheet parser (one split per line, no regexes).
+      files:  [(file_name, file_type)] in FILE order
+      tracks: [CueTrack] in sheet order (sample-accurate integer frame offsets)
+      title, performer, catalog, rem ({'DATE': ..., 'GENRE': ...}), encoding
+    Strict where a wrong answer would cut tracks at the wrong place: a TRACK before
+    any FILE, track numbers that don't increase, a track without INDEX 01, INDEX 00
+    after INDEX 01, a track starting before the previous one in the same file, or a
+    malformed time raise CueError.
+    Use CueSheet.load(path) for files.
+    """
+    CACHE_SIZE = 4096
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self):
+        self.files = []
+        self.tracks = []
+        self.title = ""
+        self.performer = ""
+        self.catalog = ""
+        self.rem = {}
+        self.encoding = None
+
+    @classmethod
+    def load(cls, path, encoding=None):
+        """
+        Parses a CUE file. Results are cached by path + mtime + size (the same sheet
+        is read for extraction, DiscID and retagging); treat them as read-only.
+        """
+        key = (os.path.abspath(path), encoding)
+        st = os.stat(path)
+        with cls._cache_lock:
+            cached = cls._cache.get(key)
+            if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+                return cached[1]
+        with open(path, 'rb') as f:
+            data = f.read()
+        text, used = decode_cue(data, encoding)
+        sheet = cls.parse(text)
+        sheet.encoding = used
+        with cls._cache_lock:
+            if len(cls._cache) >= cls.CACHE_SIZE:
+                # Oldest entry first (dicts keep insertion order)
+                del cls._cache[next(iter(cls._cache))]
+            cls._cache[key] = ((st.st_mtime_ns, st.st_size), sheet)
+        return sheet
+
+    @classmethod
+    def parse(cls, text):
+        sheet = cls()
+        # CueTrack fields as a mutable row + [line number, FILE of INDEX 00]
+        tracks = []
+        track = None
+        file_index = -1
+
+        for line_no, line in enumerate(text.splitlines(), 1):
+            line = line.strip()
+            keyword, _, rest = line.partition(' ')
+            if '\t' in keyword:
+                keyword, _, rest = line.partition('\t')
+            if not keyword:
+                continue
+            keyword = keyword.upper()
+            try:
+                # Most frequent keywords first
+                if keyword == 'INDEX':
+                    number, timestamp = rest.split()
+                    number = int(number)
+                    if track is None:
+                        raise CueError("INDEX outside of a TRACK")
+                    if number == 1:
+                        # INDEX 01 after a new FILE line (gap left in the previous file): the track lives there
+                        track[2] = file_index
+                        track[4] = parse_frames(timestamp)
+                    elif number == 0:
+                        track[3] = parse_frames(timestamp)
+                        track[13] = file_index
+                    else:
+                        parse_frames(timestamp)
+                elif keyword == 'TITLE':
+                    if track is None:
+                        sheet.title = _string(rest.strip())
+                    else:
+                        track[8] = _string(rest.strip())
+                elif keyword == 'PERFORMER':
+                    if track is None:
+                        sheet.performer = _string(rest.strip())
+                    else:
+                        track[9] = _string(rest.strip())
+                elif keyword == 'TRACK':
+                    tokens = rest.split()
+                    number = int(tokens[0])
+                    if file_index < 0:
+                        raise CueError("TRACK before FILE")
+                    if tracks and number <= tracks[-1][0]:
+                        raise CueError(f"track {number} after track {tracks[-1][0]}")
+                    track = [number, tokens[1].upper() if len(tokens) > 1 else 'AUDIO', file_index,
+                             None, None, None, 0, 0, "", "", "", None, line_no, None]
+                    tracks.append(track)
+                elif keyword == 'FILE':
+                    rest = rest.strip()
+                    tokens = rest.rsplit(None, 1)
+                    if len(tokens) == 2 and not tokens[1].endswith('"'):
+                        name, file_type = _string(tokens[0]), tokens[1].upper()
+                    else:
+                        name, file_type = _string(rest), ""
+                    sheet.files.append((name, file_type))
+                    file_index += 1
+                elif keyword == 'REM':
+                    if track is None:
+                        key, _, value = rest.strip().partition(' ')
+                        if key and value:
+                            sheet.rem[key.upper()] = _string(value.strip())
+                elif keyword == 'PREGAP' and track is not None:
+                    track[6] = parse_frames(rest.strip())
+                elif keyword == 'POSTGAP' and track is not None:
+                    track[7] = parse_frames(rest.strip())
+                elif keyword == 'ISRC' and track is not None:
+                    track[10] = _string(rest.strip())
+                elif keyword == 'CATALOG':
+                    sheet.catalog = _string(rest.strip())
+            except CueError as e:
+                raise CueError(f"line {line_no}: {e}") from None
+            except (ValueError, IndexError) as e:
+                raise CueError(f"line {line_no}: {line!r}: {e}") from None
+
+        sheet.tracks = cls._finish(tracks)
+        return sheet
+
+    @staticmethod
+    def _finish(tracks):
+        """ Raw track rows -> CueTracks with ends (next INDEX 01 in the same file) """
+        result = []
+        make = CueTrack._make
+        for i, row in enumerate(tracks):
+            if row[4] is None:
+                raise CueError(f"line {row[12]}: track {row[0]} has no INDEX 01")
+            if row[3] is not None:
+                if row[13] != row[2]:
+                    # Gap at the end of the previous FILE
+                    row[3] = None
+                elif row[3] > row[4]:
+                    raise CueError(f"line {row[12]}: track {row[0]} INDEX 00 after INDEX 01")
+            if i + 1 < len(tracks):
+                following = tracks[i + 1]
+                if following[2] == row[2] and following[4] is not None:
+                    if following[4] <= row[4]:
+                        raise CueError(f"line {following[12]}: track {following[0]} starts before track {row[0]}")
+                    row[5] = following[4]
+            # Extraction starts at INDEX 01; a gap that opens a later FILE (gaps prepended,
+            # so no earlier track ends on it) starts its track at INDEX 00 instead
+            opens_file = i > 0 and tracks[i - 1][2] != row[2]
+            row[11] = row[3] if opens_file and row[3] is not None else row[4]
+            result.append(make(row[:12]))
+        return result
+
+    def metadata(self):
+        """ Album-level metadata as returned by AudioProcessor.parse_cue """
+        return {
+            'album': self.title,
+            'album_artist': self.performer or "Various Artists",
+            'date': self.rem.get('DATE', ''),
+            'genre': self.rem.get('GENRE', '')
+        }
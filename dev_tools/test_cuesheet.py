@@ -0,0 +1,94 @@
+# test_cuesheet.py - run with: python -m pytest dev_tools/test_cuesheet.py
+import os
+import sys
+import unicodedata
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cuesheet import CueSheet, decode_cue
+
+TONE_MARKS = '̣̀́̃̉'
+
+def cp1258_bytes(text):
+    """ Text as CP1258 stores it: base letter (Ăă Ơơ Ưư ... precomposed) + combining tone mark """
+    out = b''
+    for char in unicodedata.normalize('NFC', text):
+        try:
+            out += char.encode('cp1258')
+        except UnicodeEncodeError:
+            decomposed = unicodedata.normalize('NFD', char)
+            tone = next(mark for mark in decomposed if mark in TONE_MARKS)
+            out += unicodedata.normalize('NFC', decomposed.replace(tone, '')).encode('cp1258') + tone.encode('cp1258')
+    return out
+
+def cue_line(title, encode):
+    return b'TITLE "' + encode(title) + b'"\r\n'
+
+def test_cp1258_vietnamese():
+    # Only ă/đ/ơ/ư or Latin-1 vowels: no precomposed U+1EA0-U+1EF9 letters after NFC
+    for title in ("Cô đơn", "Mưa", "Tình khúc", "Người tình",
+                  "Phạm Duy - Đưa em tìm động hoa vàng", "Ăn"):
+        text, encoding = decode_cue(cue_line(title, cp1258_bytes))
+        assert encoding == 'cp1258', title
+        assert text == f'TITLE "{title}"\r\n'
+
+def test_cp1252_western():
+    # Letters that CP1258 would read as Vietnamese (ã õ ð ò ì) in their Western use
+    for title in ("São Paulo - Canções", "Mário João", "Björk Guðmundsdóttir",
+                  "così però", "Café Señor Müller"):
+        text, encoding = decode_cue(cue_line(title, lambda t: t.encode('cp1252')))
+        assert encoding == 'cp1252', title
+        assert text == f'TITLE "{title}"\r\n'
+
+def test_unicode():
+    line = 'TITLE "Cô đơn"\r\n'
+    for codec in ('utf-8', 'utf-16-le', 'utf-16-be'):
+        assert decode_cue(line.encode(codec)) == (line, codec)
+    assert decode_cue(line.encode('utf-8-sig')) == (line, 'utf-8-sig')
+
+def positions(sheet):
+    return [(t.number, t.file_index, t.start, t.index1, t.end) for t in sheet.tracks]
+
+def test_gap_single_file():
+    # The gap before track 2 stays at the end of track 1
+    sheet = CueSheet.parse('''FILE "disc.wav" WAVE
+  TRACK 01 AUDIO
+    INDEX 01 00:00:00
+  TRACK 02 AUDIO
+    INDEX 00 00:05:00
+    INDEX 01 00:06:00
+''')
+    assert positions(sheet) == [(1, 0, 0, 0, 450), (2, 0, 450, 450, None)]
+    assert sheet.tracks[1].index0 == 375
+
+def test_gap_appended_to_previous_file():
+    # INDEX 00 in the previous FILE: extracted with track 1, track 2 starts at its INDEX 01
+    sheet = CueSheet.parse('''FILE "01.wav" WAVE
+  TRACK 01 AUDIO
+    INDEX 01 00:00:00
+  TRACK 02 AUDIO
+    INDEX 00 03:00:00
+FILE "02.wav" WAVE
+    INDEX 01 00:00:00
+''')
+    assert positions(sheet) == [(1, 0, 0, 0, None), (2, 1, 0, 0, None)]
+    assert sheet.tracks[1].index0 is None
+
+def test_gap_opening_a_file():
+    # INDEX 00 at the start of a new FILE: no earlier track ends on it, so track 2
+    # is extracted from its INDEX 00 (DiscIDs still use INDEX 01)
+    sheet = CueSheet.parse('''FILE "01.wav" WAVE
+  TRACK 01 AUDIO
+    INDEX 00 00:00:00
+    INDEX 01 00:00:33
+FILE "02.wav" WAVE
+  TRACK 02 AUDIO
+    INDEX 00 00:00:00
+    INDEX 01 00:02:00
+  TRACK 03 AUDIO
+    INDEX 00 03:00:00
+    INDEX 01 03:02:00
+''')
+    # Track 1: the gap before the first track (HTOA) is not extracted, as before
+    assert positions(sheet) == [(1, 0, 33, 33, None), (2, 1, 0, 150, 13650), (3, 1, 13650, 13650, None)]
+    assert sheet.tracks[1].start_seconds == 0
@@ -0,0 +1,106 @@
+import base64
+import hashlib
+
+from mb_offline import toc_string
+
+PREGAP_SECTORS = 150          # Track 1 INDEX 01 sits at LBA 0 = sector 150 of the disc
+SECTORS_PER_SECOND = 75
+ENHANCED_CD_GAP = 11400       # Lead-out + lead-in + pregap between the sessions of an Enhanced CD
+
+class DiscTOC:
+    """
+    Audio CD table of contents: track start sectors and lead-out, in absolute
+    sectors (LBA + 150), as used by MusicBrainz DiscIDs and FreeDB IDs.
+    """
+    def __init__(self, offsets, leadout, first_track=1):
+        self.offsets = list(offsets)
+        self.leadout = leadout
+        self.first_track = first_track
+
+    @property
+    def last_track(self):
+        return self.first_track + len(self.offsets) - 1
+
+    def musicbrainz_id(self):
+        """ SHA-1 over the hex TOC, base64 with the MusicBrainz alphabet (. _ -) """
+        text = f"{self.first_track:02X}{self.last_track:02X}{self.leadout:08X}"
+        frames = {self.first_track + i: offset for i, offset in enumerate(self.offsets)}
+        text += "".join(f"{frames.get(n, 0):08X}" for n in range(1, 100))
+        digest = hashlib.sha1(text.encode('ascii')).digest()
+        return base64.b64encode(digest, altchars=b'._').decode('ascii').replace('=', '-')
+
+    def freedb_id(self):
+        """ Classic CDDB disc ID (8 hex digits) """
+        def digit_sum(n):
+            return sum(int(d) for d in str(n))
+        checksum = sum(digit_sum(offset // SECTORS_PER_SECOND) for offset in self.offsets)
+        length = self.leadout // SECTORS_PER_SECOND - self.offsets[0] // SECTORS_PER_SECOND
+        return f"{(checksum % 0xFF) << 24 | length << 8 | len(self.offsets):08x}"
+
+    def toc_string(self):
+        """ 'first last leadout offset1 ... offsetN' for /ws/2/discid?toc= """
+        return toc_string(self.offsets, self.leadout, self.first_track)
+
+    @classmethod
+    def from_nrg(cls, index):
+        """
+        TOC of the first session of an NRGIndex (the audio session of an
+        Enhanced CD, which is what DiscIDs cover).
+        Uses the CUEX/CUES INDEX 01 LBAs when present, else adds up the DAO/ETN
+        track sizes. Returns None if the session has no audio tracks.
+        """
+        starts = {}
+        leadout = None
+        for adr_ctl, track, idx, lba in index.cue_entries:
+            if track == 0xAA:
+                # First lead-out = end of session 1
+                leadout = lba if leadout is None else leadout
+            elif idx == 1 and 0 < track < 100 and leadout is None:
+                starts.setdefault(track, lba)
+        if starts and leadout is not None:
+            numbers = sorted(starts)
+            return cls([starts[n] + PREGAP_SECTORS for n in numbers], leadout + PREGAP_SECTORS, numbers[0])
+
+        session_tracks = index.sessions[0] if index.sessions else len(index.tracks)
+        tracks = index.tracks[:session_tracks]
+        if not any(t.is_audio for t in tracks):
+            return None
+        offsets = []
+        lba = 0
+        for i, track in enumerate(tracks):
+            if i:
+                lba += (track.start_offset - track.pregap_offset) // track.sector_size
+            offsets.append(lba + PREGAP_SECTORS)
+            lba += (track.end_offset - track.start_offset) // track.sector_size
+        return cls(offsets, lba + PREGAP_SECTORS, tracks[0].number)
+
+    @classmethod
+    def from_cue_sheet(cls, sheet, file_frames):
+        """
+        TOC of a CueSheet (single or multi FILE). file_frames[i] is the length of
+        FILE i in CD frames; files play back to back, and PREGAP/POSTGAP silence
+        (not in the files) moves everything after it. Audio tracks up to the
+        first data track only (Enhanced CD).
+        """
+        file_starts = [0]
+        for frames in file_frames:
+            file_starts.append(file_starts[-1] + frames)
+        offsets = []
+        shift = 0
+        leadout = None
+        for track in sheet.tracks:
+            shift += track.pregap
+            position = file_starts[track.file_index] + track.index1 + shift + PREGAP_SECTORS
+            if track.type != 'AUDIO':
+                # Enhanced CD: the audio session ends 11400 sectors before the data track
+                leadout = position - ENHANCED_CD_GAP
+                break
+            offsets.append(position)
+            shift += track.postgap
+        if not offsets:
+            return None
+        if leadout is None:
+            leadout = file_starts[-1] + shift + PREGAP_SECTORS
+        if leadout <= offsets[-1]:
+            return None
+        return cls(offsets, leadout, sheet.tracks[0].number)
@@ -0,0 +1,170 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+
+from cache import read_flac_streaminfo
+
+def source_stamp(path):
+    """ (mtime_ns, size) of a source file, or None if it is gone """
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def output_checksum(path):
+    """ FLAC: the STREAMINFO audio MD5 (survives retagging). Other formats: None """
+    info = read_flac_streaminfo(path)
+    return info['md5'] if info and info['md5'] else None
+
+class JobJournal:
+    """
+    Persistent record of finished work, so an interrupted run resumes where it stopped.
+      tracks: one row per finished output file: source stamp + the source range it
+              came from, output size and checksum.
+      jobs:   one row per source (image, CUE or audio file) with its status and outputs.
+    A track counts as done only while its source is unchanged and the output still
+    matches: FLAC by audio MD5 (tags may change later), other formats by size.
+    For raw CDDA sources the FLAC MD5 is also checked against the MD5 of the PCM
+    range when the track is recorded, so a bad encode is never marked done.
+    Rows are committed as each track finishes; safe for worker threads (one
+    connection per thread, WAL).
+    """
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS tracks (
+                    output_path TEXT PRIMARY KEY,
+                    source_path TEXT NOT NULL,
+                    source_mtime_ns INTEGER NOT NULL,
+                    source_size INTEGER NOT NULL,
+                    source_range TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    checksum TEXT,
+                    finished REAL NOT NULL
+                )""")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    source_path TEXT PRIMARY KEY,
+                    source_mtime_ns INTEGER,
+                    source_size INTEGER,
+                    status TEXT NOT NULL,
+                    outputs TEXT NOT NULL,
+                    updated REAL NOT NULL,
+                    settings TEXT NOT NULL DEFAULT ''
+                )""")
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(jobs)")]
+            if 'settings' not in columns:
+                # Journals from before job settings were recorded
+                conn.execute("ALTER TABLE jobs ADD COLUMN settings TEXT NOT NULL DEFAULT ''")
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # --- Tracks ---
+    def track_done(self, output_path, source_path, source_range):
+        """ True if output_path was finished from this (unchanged) source range and is intact """
+        output_path = os.path.abspath(output_path)
+        row = self._conn().execute(
+            "SELECT source_path, source_mtime_ns, source_size, source_range, size, checksum FROM tracks WHERE output_path = ?",
+            (output_path,)).fetchone()
+        if not row:
+            return False
+        stamp = source_stamp(source_path)
+        if (row[0], (row[1], row[2]), row[3]) != (os.path.abspath(source_path), stamp, source_range):
+            return False
+        return self._output_intact(output_path, row[4], row[5])
+
+    @staticmethod
+    def _output_intact(output_path, size, checksum):
+        try:
+            current_size = os.path.getsize(output_path)
+        except OSError:
+            return False
+        if checksum:
+            return output_checksum(output_path) == checksum
+        return current_size == size
+
+    def record_track(self, output_path, source_path, source_range, expected_checksum=None):
+        """
+        Marks output_path finished (call only once the file is completely written).
+        expected_checksum is the MD5 of the PCM that went in, when known (raw CDDA
+        sources): an output whose FLAC MD5 differs is not recorded.
+        Returns True if recorded.
+        """
+        output_path = os.path.abspath(output_path)
+        stamp = source_stamp(source_path)
+        if stamp is None or not os.path.exists(output_path):
+            return False
+        checksum = output_checksum(output_path)
+        if expected_checksum and checksum != expected_checksum:
+            print(f"Checksum mismatch for {output_path}: FLAC MD5 {checksum}, expected {expected_checksum}")
+            return False
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                         (output_path, os.path.abspath(source_path), stamp[0], stamp[1], source_range,
+                          os.path.getsize(output_path), checksum, time.time()))
+        return True
+
+    # --- Jobs ---
+    # settings: the options that shape a job's outputs (silence parameters, SACD
+    # format, identify, ...); a finished job only counts for the same settings
+    def start_job(self, source_path, settings=""):
+        self._set_job(source_path, "running", [], settings)
+
+    def finish_job(self, source_path, outputs, settings=""):
+        self._set_job(source_path, "done", outputs, settings)
+
+    def fail_job(self, source_path, settings=""):
+        self._set_job(source_path, "failed", [], settings)
+
+    def _set_job(self, source_path, status, outputs, settings):
+        stamp = source_stamp(source_path) or (None, None)
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO jobs (source_path, source_mtime_ns, source_size, status, "
+                         "outputs, updated, settings) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                         (os.path.abspath(source_path), stamp[0], stamp[1], status,
+                          json.dumps([os.path.abspath(p) for p in outputs]), time.time(), settings))
+
+    def finished_outputs(self, source_path, settings=""):
+        """
+        Outputs of a finished job whose source and settings are unchanged and whose
+        outputs are all still up to date, else None (job must run / resume).
+        Outputs with a track row are re-checked against that row, so e.g. a
+        changed BIN behind an unchanged CUE is caught. Costs a stat and a FLAC
+        header read per output.
+        """
+        conn = self._conn()
+        row = conn.execute(
+            "SELECT source_mtime_ns, source_size, status, outputs, settings FROM jobs WHERE source_path = ?",
+            (os.path.abspath(source_path),)).fetchone()
+        if not row or row[2] != "done" or (row[0], row[1]) != source_stamp(source_path) or row[4] != settings:
+            return None
+        outputs = json.loads(row[3])
+        if not outputs:
+            return None
+        for output_path in outputs:
+            track = conn.execute(
+                "SELECT source_path, source_mtime_ns, source_size, size, checksum FROM tracks WHERE output_path = ?",
+                (output_path,)).fetchone()
+            if track is None:
+                if not os.path.exists(output_path):
+                    return None
+            elif source_stamp(track[0]) != (track[1], track[2]) or not self._output_intact(output_path, track[3], track[4]):
+                return None
+        return outputs
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
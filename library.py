@@ -0,0 +1,243 @@
+import os
+import json
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from processor import get_app_data_dir
+
+# Scan rules: a "married" folder has a CUE + unsplit source(s) and no split tracks yet
+AUDIO_EXTS = {'.flac', '.wav', '.mp3', '.m4a', '.ape', '.wv', '.dsf', '.dff'}
+IMAGE_EXTS = ('.bin', '.iso', '.nrg', '.img')
+SOURCE_MIN_SIZE = 100 * 1024 * 1024  # Audio files above this are whole-disc sources
+
+def classify_folder(entries):
+    """
+    Applies the scan rules to one folder.
+    entries = [(file_name, size_in_bytes)]
+    Returns: {'cue_files': [...], 'source_count': int, 'track_count': int}
+    """
+    cue_files = []
+    source_count = 0
+    track_count = 0
+    
+    for name, size in entries:
+        lower = name.lower()
+        if lower.endswith('.cue'):
+            cue_files.append(name)
+            continue
+        if lower.endswith(IMAGE_EXTS):
+            source_count += 1
+            continue
+        if os.path.splitext(lower)[1] in AUDIO_EXTS:
+            if size > SOURCE_MIN_SIZE:
+                source_count += 1
+            else:
+                track_count += 1
+    
+    return {'cue_files': cue_files, 'source_count': source_count, 'track_count': track_count}
+
+def is_married(record):
+    # Married = Has CUE + Source, No Tracks
+    return bool(record['cue_files']) and record['source_count'] > 0 and record['track_count'] == 0
+
+def married_entry(path, record):
+    """ Result row used by the GUI / CLI """
+    return {
+        'path': path,
+        'cue': record['cue_files'][0],
+        'cue_count': len(record['cue_files']),
+        'source_count': record['source_count']
+    }
+
+class LibraryIndex:
+    """
+    Persistent scan index (SQLite) keyed by directory path + mtime.
+    A directory's mtime changes whenever entries are added/removed/renamed in it,
+    so unchanged directories reuse their stored classification AND child list:
+    a rescan only stats directories and lists the ones that changed.
+    """
+    def __init__(self, db_path=None):
+        self.db_path = db_path or os.path.join(get_app_data_dir(), "library_index.db")
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS dirs (
+                    path TEXT PRIMARY KEY,
+                    mtime_ns INTEGER NOT NULL,
+                    subdirs TEXT NOT NULL,
+                    cue_files TEXT NOT NULL,
+                    source_count INTEGER NOT NULL,
+                    track_count INTEGER NOT NULL,
+                    married INTEGER NOT NULL
+                )""")
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _subtree_bounds(root):
+        # All paths under root sort between "root<sep>" and "root<sep>\U0010ffff" (the
+        # highest code point, also in SQLite's UTF-8 byte order: emoji sort above \uffff)
+        prefix = os.path.join(root, "")
+        return prefix, prefix + "\U0010ffff"
+
+    def load(self, root):
+        """ Returns {path: record} for root and everything stored below it """
+        root = os.path.normpath(root)
+        low, high = self._subtree_bounds(root)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, mtime_ns, subdirs, cue_files, source_count, track_count FROM dirs "
+                "WHERE path = ? OR (path >= ? AND path < ?)", (root, low, high)).fetchall()
+        return {
+            path: {
+                'mtime_ns': mtime_ns,
+                'subdirs': json.loads(subdirs),
+                'cue_files': json.loads(cue_files),
+                'source_count': source_count,
+                'track_count': track_count
+            }
+            for path, mtime_ns, subdirs, cue_files, source_count, track_count in rows
+        }
+
+    def store(self, records):
+        """ Upserts {path: record} in one transaction """
+        rows = [
+            (path, r['mtime_ns'], json.dumps(r['subdirs']), json.dumps(r['cue_files']),
+             r['source_count'], r['track_count'], int(is_married(r)))
+            for path, r in records.items()
+        ]
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO dirs VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def remove(self, paths):
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM dirs WHERE path = ?", [(p,) for p in paths])
+
+    def married_folders(self, root):
+        """ Married folders under root straight from the index (no disk access) """
+        root = os.path.normpath(root)
+        low, high = self._subtree_bounds(root)
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT path, cue_files, source_count FROM dirs "
+                "WHERE married = 1 AND (path = ? OR (path >= ? AND path < ?)) ORDER BY path",
+                (root, low, high)).fetchall()
+        return [
+            married_entry(path, {'cue_files': json.loads(cue_files), 'source_count': source_count})
+            for path, cue_files, source_count in rows
+        ]
+
+def scan_dir(path, mtime_ns):
+    """
+    Lists one directory with os.scandir and classifies it. DirEntry results are
+    reused: child directory mtimes come from the entries (free on Windows) and
+    only audio files are sized. Returns (record, {subdir_path: mtime_ns or None}).
+    """
+    subdirs = {}
+    entries = []
+    try:
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        subdirs[entry.path] = entry.stat(follow_symlinks=False).st_mtime_ns
+                    elif entry.is_file():
+                        # Only audio files need a size (source vs track rule)
+                        is_audio = os.path.splitext(entry.name)[1].lower() in AUDIO_EXTS
+                        entries.append((entry.name, entry.stat().st_size if is_audio else 0))
+                except OSError:
+                    pass
+    except OSError as e:
+        print(f"Scan error in {path}: {e}")
+        return None, {}
+    
+    record = classify_folder(entries)
+    record['mtime_ns'] = mtime_ns
+    record['subdirs'] = sorted(os.path.basename(p) for p in subdirs)
+    return record, subdirs
+
+class LibraryScanner:
+    """
+    Parallel library walker. Every directory is one task on a thread pool
+    (os.scandir is I/O bound, so threads overlap network/disk latency), and each
+    task submits its subdirectories. With a LibraryIndex, directories whose mtime
+    is unchanged are not listed again. Married folders are streamed to on_folder
+    as they are found (called from worker threads).
+    """
+    def __init__(self, index=None, workers=16):
+        self.index = index
+        self.workers = workers
+
+    def scan(self, root, on_folder=None, full=False):
+        """
+        Scans root and returns all married folders (see married_entry), sorted by path.
+        full=True ignores the stored index state (e.g. filesystems without reliable dir mtimes).
+        """
+        root = os.path.normpath(root)
+        known = {} if (full or self.index is None) else self.index.load(root)
+        seen = set()
+        changed = {}
+        found = []
+        lock = threading.Lock()
+        done = threading.Condition(lock)
+        pending = [0]
+        
+        def submit(path, mtime_ns):
+            with lock:
+                pending[0] += 1
+            pool.submit(visit, path, mtime_ns)
+        
+        def visit(path, mtime_ns):
+            try:
+                if mtime_ns is None:
+                    mtime_ns = os.stat(path).st_mtime_ns
+                
+                record = known.get(path)
+                if record is not None and record['mtime_ns'] == mtime_ns:
+                    # Unchanged: stored children, their mtimes need a stat
+                    children = {os.path.join(path, d): None for d in record['subdirs']}
+                else:
+                    record, children = scan_dir(path, mtime_ns)
+                    if record is None:
+                        return
+                    with lock:
+                        changed[path] = record
+                
+                entry = married_entry(path, record) if is_married(record) else None
+                with lock:
+                    seen.add(path)
+                    if entry:
+                        found.append(entry)
+                if entry and on_folder:
+                    on_folder(entry)
+                
+                for child, child_mtime in children.items():
+                    submit(child, child_mtime)
+            except OSError:
+                pass
+            except Exception as e:
+                print(f"Scan error in {path}: {e}")
+            finally:
+                with lock:
+                    pending[0] -= 1
+                    if pending[0] == 0:
+                        done.notify_all()
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.workers)) as pool:
+            submit(root, None)
+            with lock:
+                while pending[0]:
+                    done.wait()
+        
+        if self.index is not None:
+            if changed:
+                self.index.store(changed)
+            stale = [p for p in known if p not in seen]
+            if stale:
+                self.index.remove(stale)
+        
+        return sorted(found, key=lambda entry: entry['path'])
@@ -10,15 +10,23 @@ if sys.platform.startswith('win'):
 
 from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QTabWidget,
                              QLabel, QPushButton, QListWidget, QProgressBar, QTableWidget, QTableWidgetItem,
-                             QFileDialog, QMessageBox, QSpinBox, QDoubleSpinBox, QLineEdit, QHeaderView)
+                             QFileDialog, QMessageBox, QSpinBox, QDoubleSpinBox, QLineEdit, QHeaderView, QCheckBox,
+                             QComboBox)
 from PyQt6.QtCore import Qt, pyqtSignal, QObject
 from processor import AudioProcessor
+from library import LibraryIndex, LibraryScanner
+from batch import BatchScheduler
 
 class WorkerSignals(QObject):
     progress = pyqtSignal(str)
     finished = pyqtSignal()
     error = pyqtSignal(str)
     success = pyqtSignal(str)
+    folder_found = pyqtSignal(dict)
+    scan_finished = pyqtSignal(list)
+    folder_status = pyqtSignal(int, str)
+    batch_step = pyqtSignal(int)
+    silence_suggested = pyqtSignal(int, float, int)
 
 class AutoSplitTagger(QMainWindow):
     def __init__(self):
@@ -30,6 +38,8 @@ class AutoSplitTagger(QMainWindow):
         self.processor = AudioProcessor()
         self.file_queue = []
         self.married_folders = []
+        self.library_index = None
+        self.scan_root = ""
 
         # UI Setup with Tabs
         central_widget = QWidget()
@@ -55,6 +65,11 @@ class AutoSplitTagger(QMainWindow):
         self.signals.finished.connect(self.on_process_finished)
         self.signals.error.connect(self.show_error)
         self.signals.success.connect(self.show_success)
+        self.signals.folder_found.connect(self.on_folder_found)
+        self.signals.scan_finished.connect(self.on_scan_finished)
+        self.signals.folder_status.connect(self.on_folder_status)
+        self.signals.batch_step.connect(self.batch_progress.setValue)
+        self.signals.silence_suggested.connect(self.on_silence_suggested)
 
         # CLI / Auto-Run Check
         self.auto_exit = False
@@ -104,6 +119,40 @@ class AutoSplitTagger(QMainWindow):
         controls_layout.addWidget(self.lbl_dur)
         controls_layout.addWidget(self.spin_dur)
         
+        # Auto-tune: sweep thresholds against one cached decode
+        suggest_layout = QHBoxLayout()
+        suggest_layout.addWidget(QLabel("Expected Tracks:"))
+        self.spin_target = QSpinBox()
+        self.spin_target.setRange(1, 99)
+        self.spin_target.setValue(12)
+        suggest_layout.addWidget(self.spin_target)
+        self.btn_suggest = QPushButton("Suggest Settings")
+        self.btn_suggest.setToolTip("Decodes the first queued audio file once and picks the threshold/duration matching the expected track count.")
+        self.btn_suggest.clicked.connect(self.suggest_silence_settings)
+        suggest_layout.addWidget(self.btn_suggest)
+        controls_layout.addLayout(suggest_layout)
+        
+        # Disc images: look the whole disc up by DiscID after extraction
+        self.chk_identify = QCheckBox("Identify discs via MusicBrainz (NRG/CUE)")
+        self.chk_identify.setToolTip("One DiscID query per disc; per-track fingerprints only if the disc is not found.")
+        controls_layout.addWidget(self.chk_identify)
+        
+        # SACD: PCM format of the FLACs converted from DSD
+        sacd_layout = QHBoxLayout()
+        sacd_layout.addWidget(QLabel("SACD FLAC:"))
+        self.combo_sacd_rate = QComboBox()
+        self.combo_sacd_rate.addItem("Default rate", None)
+        for rate in AudioProcessor.SACD_PCM_RATES:
+            self.combo_sacd_rate.addItem(f"{rate / 1000:g} kHz", rate)
+        self.combo_sacd_rate.setToolTip("Higher rates keep more of the DSD bandwidth but convert slower and take more space.")
+        sacd_layout.addWidget(self.combo_sacd_rate)
+        self.combo_sacd_bits = QComboBox()
+        self.combo_sacd_bits.addItem("Default depth", None)
+        for bits in AudioProcessor.SACD_BIT_DEPTHS:
+            self.combo_sacd_bits.addItem(f"{bits} bit", bits)
+        sacd_layout.addWidget(self.combo_sacd_bits)
+        controls_layout.addLayout(sacd_layout)
+        
         # Browse Button
         self.btn_browse = QPushButton("Browse Files...")
         self.btn_browse.clicked.connect(self.browse_files)
@@ -160,6 +209,24 @@ class AutoSplitTagger(QMainWindow):
         self.batch_progress = QProgressBar()
         layout.addWidget(self.batch_progress)
 
+        # Folders processed concurrently, throttled per physical disk
+        parallel_layout = QHBoxLayout()
+        parallel_layout.addWidget(QLabel("Folders in parallel:"))
+        self.spin_parallel = QSpinBox()
+        self.spin_parallel.setRange(1, 32)
+        self.spin_parallel.setValue(2)
+        self.spin_parallel.setToolTip("Upper bound across all disks; see 'Per disk' for folders sharing one disk.")
+        parallel_layout.addWidget(self.spin_parallel)
+        parallel_layout.addWidget(QLabel("Per disk:"))
+        self.spin_per_disk = QSpinBox()
+        self.spin_per_disk.setRange(0, 32)
+        self.spin_per_disk.setValue(0)
+        self.spin_per_disk.setSpecialValueText("Auto")
+        self.spin_per_disk.setToolTip("Folders on the same physical disk at once. "
+                                      f"Auto: {BatchScheduler.SSD_PER_DISK} on SSDs, 1 on spinning disks.")
+        parallel_layout.addWidget(self.spin_per_disk)
+        layout.addLayout(parallel_layout)
+
         # Process button
         self.btn_process_batch = QPushButton("Process All Married Folders")
         self.btn_process_batch.setStyleSheet("background-color: #FF9800; color: white; padding: 10px; font-weight: bold;")
@@ -180,51 +247,50 @@ class AutoSplitTagger(QMainWindow):
             return
 
         self.lbl_stats.setText("Scanning...")
+        self.btn_scan.setEnabled(False)
+        self.btn_process_batch.setEnabled(False)
         self.married_folders = []
+        self.scan_root = root_path
+        self.table_married.setRowCount(0)
         
-        # Scan logic (from scan_library.py)
-        for root, dirs, files in os.walk(root_path):
-            cue_files = [f for f in files if f.lower().endswith('.cue')]
-            if not cue_files:
-                continue
-                
-            audio_exts = {'.flac', '.wav', '.mp3', '.m4a', '.ape', '.wv', '.dsf', '.dff'}
-            source_files = []
-            track_files = []
-            
-            for f in files:
-                lower = f.lower()
-                ext = os.path.splitext(lower)[1]
-                if lower.endswith(('.bin', '.iso', '.nrg', '.img')):
-                    source_files.append(f)
-                    continue
-                if ext in audio_exts:
-                    try:
-                        if os.path.getsize(os.path.join(root, f)) > 100 * 1024 * 1024:
-                            source_files.append(f)
-                        else:
-                            track_files.append(f)
-                    except:
-                        pass
-            
-            # Married = Has Source, No Tracks
-            if source_files and not track_files:
-                self.married_folders.append({
-                    'path': root,
-                    'cue': cue_files[0],
-                    'cue_count': len(cue_files),
-                    'source_count': len(source_files)
-                })
-
-        # Update table
-        self.table_married.setRowCount(len(self.married_folders))
-        for i, folder in enumerate(self.married_folders):
-            self.table_married.setItem(i, 0, QTableWidgetItem(os.path.relpath(folder['path'], root_path)))
-            self.table_married.setItem(i, 1, QTableWidgetItem(str(folder['cue_count'])))
-            self.table_married.setItem(i, 2, QTableWidgetItem(str(folder['source_count'])))
-            self.table_married.setItem(i, 3, QTableWidgetItem("Pending"))
+        # Incremental scan: only directories whose mtime changed are re-listed
+        if self.library_index is None:
+            self.library_index = LibraryIndex()
+        scanner = LibraryScanner(self.library_index)
+        
+        def scan_worker():
+            try:
+                result = scanner.scan(root_path, on_folder=self.signals.folder_found.emit)
+            except Exception as e:
+                self.signals.progress.emit(f"Scan Error: {e}")
+                result = []
+            self.signals.scan_finished.emit(result)
+        
+        thread = threading.Thread(target=scan_worker, daemon=True)
+        thread.start()
+
+    def add_married_row(self, folder, status="Pending"):
+        row = self.table_married.rowCount()
+        self.table_married.insertRow(row)
+        self.table_married.setItem(row, 0, QTableWidgetItem(os.path.relpath(folder['path'], self.scan_root)))
+        self.table_married.setItem(row, 1, QTableWidgetItem(str(folder['cue_count'])))
+        self.table_married.setItem(row, 2, QTableWidgetItem(str(folder['source_count'])))
+        self.table_married.setItem(row, 3, QTableWidgetItem(status))
+
+    def on_folder_found(self, folder):
+        """ Streams scan results into the table as they are found """
+        self.add_married_row(folder)
+        self.lbl_stats.setText(f"Scanning... {self.table_married.rowCount()} married folders so far")
+
+    def on_scan_finished(self, married_folders):
+        # Final list is sorted; rebuild so row i matches self.married_folders[i]
+        self.married_folders = married_folders
+        self.table_married.setRowCount(0)
+        for folder in self.married_folders:
+            self.add_married_row(folder)
 
         self.lbl_stats.setText(f"Found {len(self.married_folders)} married folders ready to process")
+        self.btn_scan.setEnabled(True)
         self.btn_process_batch.setEnabled(len(self.married_folders) > 0)
 
     def start_batch_processing(self):
@@ -236,28 +302,26 @@ class AutoSplitTagger(QMainWindow):
         self.batch_progress.setMaximum(len(self.married_folders))
         self.batch_progress.setValue(0)
 
+        folders = list(self.married_folders)
+        scheduler = BatchScheduler(self.processor, max_in_flight=self.spin_parallel.value(),
+                                   per_disk=self.spin_per_disk.value() or None)
+
         def batch_worker():
-            for i, folder in enumerate(self.married_folders):
-                cue_path = os.path.join(folder['path'], folder['cue'])
-                self.signals.progress.emit(f"Processing {i+1}/{len(self.married_folders)}: {folder['path']}")
-                
-                try:
-                    result = self.processor.process_iso_workflow(cue_path, folder['path'])
-                    if result:
-                        self.table_married.setItem(i, 3, QTableWidgetItem(f"✓ {len(result)} files"))
-                    else:
-                        self.table_married.setItem(i, 3, QTableWidgetItem("✗ Failed"))
-                except Exception as e:
-                    self.table_married.setItem(i, 3, QTableWidgetItem(f"✗ Error: {str(e)[:20]}"))
-                
-                self.batch_progress.setValue(i + 1)
+            scheduler.run(folders,
+                          on_status=self.signals.folder_status.emit,
+                          on_done=self.signals.batch_step.emit)
 
-            self.signals.success.emit(f"Batch processing complete! Processed {len(self.married_folders)} folders.")
+            self.signals.success.emit(f"Batch processing complete! Processed {len(folders)} folders.")
             self.signals.finished.emit()
 
         thread = threading.Thread(target=batch_worker, daemon=True)
         thread.start()
 
+    def on_folder_status(self, index, status):
+        self.table_married.setItem(index, 3, QTableWidgetItem(status))
+        if status == "Processing..." and index < len(self.married_folders):
+            self.update_log(f"Processing {index+1}/{len(self.married_folders)}: {self.married_folders[index]['path']}")
+
     def dragEnterEvent(self, event):
         if event.mimeData().hasUrls():
             event.acceptProposedAction()
@@ -308,6 +372,35 @@ class AutoSplitTagger(QMainWindow):
         if self.auto_exit:
             self.close()
 
+    def suggest_silence_settings(self):
+        audio_files = [f for f in self.file_queue if f.lower().endswith(('.flac', '.wav', '.mp3', '.m4a'))]
+        if not audio_files:
+            QMessageBox.warning(self, "Error", "Queue an audio file first!")
+            return
+        file_path = audio_files[0]
+        target = self.spin_target.value()
+        self.btn_suggest.setEnabled(False)
+        self.update_log(f"Analyzing loudness: {os.path.basename(file_path)}")
+
+        def suggest_worker():
+            try:
+                db, dur, tracks = self.processor.suggest_silence_params(file_path, target)
+                self.signals.silence_suggested.emit(int(db), float(dur), len(tracks))
+            except Exception as e:
+                self.signals.error.emit(f"Suggest Error: {str(e)}")
+                self.signals.silence_suggested.emit(0, 0.0, -1)
+
+        thread = threading.Thread(target=suggest_worker, daemon=True)
+        thread.start()
+
+    def on_silence_suggested(self, db, dur, track_count):
+        self.btn_suggest.setEnabled(True)
+        if track_count < 0:
+            return
+        self.spin_db.setValue(db)
+        self.spin_dur.setValue(dur)
+        self.update_log(f"Suggested: {db} dB / {dur:.2f} s -> {track_count} tracks")
+
     def start_processing(self):
         if not self.file_queue:
             return
@@ -315,15 +408,18 @@ class AutoSplitTagger(QMainWindow):
         self.progress_bar.setValue(0)
         db_threshold = self.spin_db.value()
         min_duration = self.spin_dur.value()
+        identify = self.chk_identify.isChecked()
+        self.processor.sacd_pcm_rate = self.combo_sacd_rate.currentData()
+        self.processor.sacd_bit_depth = self.combo_sacd_bits.currentData()
         
         thread = threading.Thread(
             target=self.run_logic, 
-            args=(self.file_queue.copy(), db_threshold, min_duration),
+            args=(self.file_queue.copy(), db_threshold, min_duration, identify),
             daemon=True
         )
         thread.start()
 
-    def run_logic(self, queue, db, dur):
+    def run_logic(self, queue, db, dur, identify=False):
         try:
             for file_path in queue:
                 self.signals.progress.emit(f"Processing: {os.path.basename(file_path)}")
@@ -333,7 +429,7 @@ class AutoSplitTagger(QMainWindow):
                 
                 # Disc Image Workflow (ISO/NRG/CUE)
                 if lower.endswith(('.iso', '.nrg', '.cue')):
-                    generated_files = self.processor.process_iso_workflow(file_path, output_dir)
+                    generated_files = self.processor.process_iso_workflow(file_path, output_dir, identify=identify)
                     if generated_files:
                         self.signals.success.emit(f"✅ Extracted {len(generated_files)} tracks from {os.path.basename(file_path)}")
                     else:
@@ -342,6 +438,13 @@ class AutoSplitTagger(QMainWindow):
                 
                 # Audio File Workflow (Silence Detection)
                 if lower.endswith(('.flac', '.wav', '.mp3', '.m4a')):
+                    journal = self.processor.journal
+                    settings = self.processor.split_job_settings(db, dur)
+                    finished = journal.finished_outputs(file_path, settings) if self.processor.resume else None
+                    if finished:
+                        self.signals.success.emit(f"✅ Already split into {len(finished)} tracks, skipping.")
+                        continue
+                    
                     self.signals.progress.emit("Detecting silence...")
                     tracks = self.processor.detect_silence(file_path, db_threshold=db, min_duration=dur)
                     
@@ -353,6 +456,7 @@ class AutoSplitTagger(QMainWindow):
                     split_files = self.processor.split_file(file_path, tracks, output_dir)
                     
                     if split_files:
+                        journal.finish_job(file_path, split_files, settings)
                         self.signals.success.emit(f"✅ Split into {len(split_files)} tracks!")
                     continue
 
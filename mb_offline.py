@@ -0,0 +1,373 @@
+import os
+import io
+import bz2
+import gzip
+import json
+import lzma
+import sqlite3
+import tarfile
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+def open_dump(path):
+    """
+    Yields one release JSON object per line from a MusicBrainz JSON dump.
+    Accepts the plain JSON-lines file, its .gz/.bz2/.xz form, or the
+    release.tar.xz archive itself (reads the mbdump/release member).
+    """
+    if tarfile.is_tarfile(path):
+        with tarfile.open(path) as tar:
+            for member in tar:
+                if member.isfile() and os.path.basename(member.name) == "release":
+                    yield from _iter_lines(io.TextIOWrapper(tar.extractfile(member), encoding='utf-8'))
+        return
+    openers = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+    opener = openers.get(os.path.splitext(path)[1].lower(), open)
+    with opener(path, 'rt', encoding='utf-8') as f:
+        yield from _iter_lines(f)
+
+def _iter_lines(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def credit_name(artist_credit):
+    """ 'Artist A feat. Artist B' from a MusicBrainz artist-credit list """
+    if not artist_credit:
+        return None
+    name = "".join((c.get('name') or c.get('artist', {}).get('name', '')) + (c.get('joinphrase') or '')
+                   for c in artist_credit)
+    return name or None
+
+def toc_string(offsets, leadout, first=1):
+    """ MusicBrainz TOC string: 'first last leadout offset1 ... offsetN' (sectors, incl. 150 pregap) """
+    return " ".join(str(n) for n in [first, first + len(offsets) - 1, leadout] + list(offsets))
+
+def parse_toc(toc):
+    """ Inverse of toc_string(): returns (offsets, leadout) """
+    values = [int(v) for v in toc.replace('+', ' ').split()]
+    first, last, leadout = values[:3]
+    offsets = values[3:]
+    if len(offsets) != last - first + 1:
+        raise ValueError(f"Malformed TOC: {toc}")
+    return offsets, leadout
+
+class OfflineMusicBrainz:
+    """
+    Local MusicBrainz subset (recordings, releases, artist credits, disc IDs/TOCs)
+    imported from the JSON release dump into one indexed SQLite file.
+    Answers recording-MBID -> tags and discid/TOC -> release without a server.
+    Reads use one connection per thread, so a single instance can be shared.
+    """
+    TOC_TOLERANCE = 150   # Sectors a fuzzy TOC match may differ by, per offset (like the web service)
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        with self._conn() as conn:
+            conn.executescript("""
+                CREATE TABLE IF NOT EXISTS releases (
+                    mbid TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    artist TEXT,
+                    date TEXT,
+                    barcode TEXT
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS recordings (
+                    mbid TEXT PRIMARY KEY,
+                    title TEXT NOT NULL,
+                    artist TEXT,
+                    length INTEGER
+                ) WITHOUT ROWID;
+                CREATE TABLE IF NOT EXISTS tracks (
+                    release_mbid TEXT NOT NULL,
+                    medium INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    number TEXT,
+                    recording_mbid TEXT NOT NULL,
+                    title TEXT,
+                    artist TEXT,
+                    length INTEGER,
+                    PRIMARY KEY (release_mbid, medium, position)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS tracks_recording ON tracks(recording_mbid);
+                CREATE TABLE IF NOT EXISTS discs (
+                    discid TEXT NOT NULL,
+                    release_mbid TEXT NOT NULL,
+                    medium INTEGER NOT NULL,
+                    track_count INTEGER NOT NULL,
+                    leadout INTEGER NOT NULL,
+                    offsets TEXT NOT NULL,
+                    PRIMARY KEY (discid, release_mbid, medium)
+                ) WITHOUT ROWID;
+                CREATE INDEX IF NOT EXISTS discs_toc ON discs(track_count, leadout);
+            """)
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    @classmethod
+    def available(cls, db_path):
+        """ Opens db_path if an imported store exists there, else returns None """
+        if not db_path or not os.path.isfile(db_path):
+            return None
+        return cls(db_path)
+
+    # --- Import ---
+    def import_dump(self, path, batch_size=1000, on_progress=None):
+        """
+        Imports (or refreshes) releases from a JSON dump. Returns the release count.
+        on_progress(count) is called after each committed batch.
+        """
+        count = 0
+        batch = []
+        for release in open_dump(path):
+            batch.append(release)
+            if len(batch) >= batch_size:
+                count += self._import_batch(batch)
+                batch = []
+                if on_progress:
+                    on_progress(count)
+        if batch:
+            count += self._import_batch(batch)
+            if on_progress:
+                on_progress(count)
+        with self._conn() as conn:
+            conn.execute("ANALYZE")
+        return count
+
+    def _import_batch(self, batch):
+        releases, recordings, tracks, discs = [], {}, [], []
+        for release in batch:
+            rid = release['id']
+            release_artist = credit_name(release.get('artist-credit'))
+            releases.append((rid, release.get('title', ''), release_artist, release.get('date') or None, release.get('barcode') or None))
+            for medium in release.get('media') or []:
+                pos = medium.get('position') or 1
+                for track in medium.get('tracks') or []:
+                    rec = track.get('recording') or {}
+                    if not rec.get('id'):
+                        continue
+                    rec_artist = credit_name(rec.get('artist-credit')) or release_artist
+                    recordings[rec['id']] = (rec['id'], rec.get('title') or track.get('title', ''), rec_artist, rec.get('length'))
+                    tracks.append((rid, pos, track.get('position') or 0, track.get('number'), rec['id'],
+                                   track.get('title') or rec.get('title'),
+                                   credit_name(track.get('artist-credit')) or rec_artist,
+                                   track.get('length') or rec.get('length')))
+                for disc in medium.get('discs') or []:
+                    offsets = disc.get('offsets') or []
+                    if disc.get('id') and offsets and disc.get('sectors'):
+                        discs.append((disc['id'], rid, pos, len(offsets), disc['sectors'], " ".join(map(str, offsets))))
+        with self._conn() as conn:
+            conn.executemany("DELETE FROM tracks WHERE release_mbid = ?", [(r[0],) for r in releases])
+            conn.executemany("DELETE FROM discs WHERE release_mbid = ?", [(r[0],) for r in releases])
+            conn.executemany("INSERT OR REPLACE INTO releases VALUES (?, ?, ?, ?, ?)", releases)
+            conn.executemany("INSERT OR REPLACE INTO recordings VALUES (?, ?, ?, ?)", recordings.values())
+            conn.executemany("INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)", tracks)
+            conn.executemany("INSERT OR REPLACE INTO discs VALUES (?, ?, ?, ?, ?, ?)", discs)
+        return len(releases)
+
+    # --- Recording lookups ---
+    def lookup_recording(self, mbid):
+        """ Tags for a recording MBID (same keys as MetadataClient), or None """
+        conn = self._conn()
+        rec = conn.execute("SELECT * FROM recordings WHERE mbid = ?", (mbid,)).fetchone()
+        if not rec:
+            return None
+        release = conn.execute("""
+            SELECT r.mbid, r.title, r.artist, r.date, t.medium, t.number
+            FROM tracks t JOIN releases r ON r.mbid = t.release_mbid
+            WHERE t.recording_mbid = ?
+            ORDER BY r.date IS NULL, r.date LIMIT 1""", (mbid,)).fetchone()
+        metadata = {
+            "title": rec['title'],
+            "artist": rec['artist'] or 'Unknown',
+            "album": release['title'] if release else 'Unknown',
+            "mbid": mbid
+        }
+        if release:
+            metadata.update({
+                "albumartist": release['artist'],
+                "date": release['date'],
+                "tracknumber": release['number'],
+                "discnumber": release['medium'],
+                "release_mbid": release['mbid']
+            })
+        return metadata
+
+    def recording_json(self, mbid):
+        """ /ws/2/recording/<mbid>?inc=releases+artists shaped response, or None """
+        conn = self._conn()
+        rec = conn.execute("SELECT * FROM recordings WHERE mbid = ?", (mbid,)).fetchone()
+        if not rec:
+            return None
+        releases = conn.execute("""
+            SELECT DISTINCT r.mbid, r.title, r.date FROM tracks t JOIN releases r ON r.mbid = t.release_mbid
+            WHERE t.recording_mbid = ? ORDER BY r.date IS NULL, r.date""", (mbid,)).fetchall()
+        return {
+            "id": mbid,
+            "title": rec['title'],
+            "length": rec['length'],
+            "artist-credit": [{"name": rec['artist'], "artist": {"name": rec['artist']}}] if rec['artist'] else [],
+            "releases": [{"id": r['mbid'], "title": r['title'], "date": r['date']} for r in releases]
+        }
+
+    # --- Disc lookups ---
+    def lookup_discid(self, discid):
+        """ Releases (with the matching medium's tracklist) for a MusicBrainz disc ID """
+        rows = self._conn().execute("SELECT release_mbid, medium FROM discs WHERE discid = ?", (discid,)).fetchall()
+        return [self._release(r['release_mbid'], r['medium']) for r in rows]
+
+    def lookup_toc(self, offsets, leadout, tolerance=None):
+        """
+        Fuzzy TOC match: same track count, every offset and the lead-out within
+        tolerance sectors. Best matches first.
+        """
+        tolerance = self.TOC_TOLERANCE if tolerance is None else tolerance
+        rows = self._conn().execute("""
+            SELECT release_mbid, medium, leadout, offsets FROM discs
+            WHERE track_count = ? AND leadout BETWEEN ? AND ?""",
+            (len(offsets), leadout - tolerance, leadout + tolerance)).fetchall()
+        matches = {}
+        for r in rows:
+            stored = [int(v) for v in r['offsets'].split()]
+            distance = max(abs(a - b) for a, b in zip(stored + [r['leadout']], list(offsets) + [leadout]))
+            if distance <= tolerance:
+                key = (r['release_mbid'], r['medium'])
+                matches[key] = min(distance, matches.get(key, distance))
+        ranked = sorted(matches, key=lambda k: matches[k])
+        return [self._release(mbid, medium) for mbid, medium in ranked]
+
+    def _release(self, release_mbid, medium):
+        conn = self._conn()
+        release = conn.execute("SELECT * FROM releases WHERE mbid = ?", (release_mbid,)).fetchone()
+        tracks = conn.execute("""
+            SELECT * FROM tracks WHERE release_mbid = ? AND medium = ? ORDER BY position""",
+            (release_mbid, medium)).fetchall()
+        media_count = conn.execute("SELECT COUNT(DISTINCT medium) FROM tracks WHERE release_mbid = ?",
+                                   (release_mbid,)).fetchone()[0]
+        return {
+            "mbid": release_mbid,
+            "title": release['title'] if release else 'Unknown',
+            "artist": release['artist'] if release else None,
+            "date": release['date'] if release else None,
+            "barcode": release['barcode'] if release else None,
+            "medium": medium,
+            "media_count": media_count,
+            "tracks": [{
+                "position": t['position'],
+                "number": t['number'],
+                "title": t['title'],
+                "artist": t['artist'],
+                "length": t['length'],
+                "recording_mbid": t['recording_mbid']
+            } for t in tracks]
+        }
+
+    def discid_json(self, discid, toc=None):
+        """ /ws/2/discid/<discid>[?toc=...] shaped response, or None """
+        releases = self.lookup_discid(discid) if discid and discid != '-' else []
+        if not releases and toc:
+            releases = self.lookup_toc(*parse_toc(toc))
+        if not releases:
+            return None
+        return {
+            "id": discid,
+            "releases": [{
+                "id": r['mbid'],
+                "title": r['title'],
+                "date": r['date'],
+                "barcode": r['barcode'],
+                "artist-credit": [{"name": r['artist'], "artist": {"name": r['artist']}}] if r['artist'] else [],
+                "media": [{
+                    "position": r['medium'],
+                    "track-count": len(r['tracks']),
+                    "tracks": [{
+                        "position": t['position'],
+                        "number": t['number'],
+                        "title": t['title'],
+                        "length": t['length'],
+                        "artist-credit": [{"name": t['artist'], "artist": {"name": t['artist']}}] if t['artist'] else [],
+                        "recording": {"id": t['recording_mbid'], "title": t['title'], "length": t['length']}
+                    } for t in r['tracks']]
+                }]
+            } for r in releases]
+        }
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class _WebServiceHandler(BaseHTTPRequestHandler):
+    """ The /ws/2/recording and /ws/2/discid endpoints used by MetadataClient """
+    store = None
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        parts = [p for p in url.path.split('/') if p]
+        query = parse_qs(url.query)
+        body = None
+        if len(parts) == 4 and parts[:2] == ['ws', '2']:
+            if parts[2] == 'recording':
+                body = self.store.recording_json(parts[3])
+            elif parts[2] == 'discid':
+                body = self.store.discid_json(parts[3], query.get('toc', [None])[0])
+        if body is None:
+            self._send(404, {"error": "Not Found"})
+        else:
+            self._send(200, body)
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+def make_server(store, host="127.0.0.1", port=5000):
+    """
+    Stand-in for the MusicBrainz web service backed by an OfflineMusicBrainz store
+    (for tests, or for tools that only speak HTTP). Call serve_forever() on the result.
+    """
+    handler = type("WebServiceHandler", (_WebServiceHandler,), {"store": store})
+    return ThreadingHTTPServer((host, port), handler)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline MusicBrainz index")
+    parser.add_argument("--db", required=True, help="SQLite index file")
+    sub = parser.add_subparsers(dest="command", required=True)
+    imp = sub.add_parser("import", help="Import a JSON release dump (jsonl, .gz/.bz2/.xz, or release.tar.xz)")
+    imp.add_argument("dump")
+    srv = sub.add_parser("serve", help="Serve /ws/2/recording and /ws/2/discid from the index")
+    srv.add_argument("--host", default="127.0.0.1")
+    srv.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    store = OfflineMusicBrainz(args.db)
+    if args.command == "import":
+        total = store.import_dump(args.dump, on_progress=lambda n: print(f"\r{n} releases", end="", flush=True))
+        print(f"\nImported {total} releases into {args.db}")
+    else:
+        server = make_server(store, args.host, args.port)
+        print(f"Serving {args.db} on http://{args.host}:{args.port}/ws/2/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+
+if __name__ == "__main__":
+    main()
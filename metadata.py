@@ -0,0 +1,302 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from mb_offline import credit_name
+
+class RateLimiter:
+    """
+    Thread-safe request spacing: at most `rate` calls per second across all threads.
+    """
+    def __init__(self, rate):
+        self.interval = 1.0 / rate
+        self._lock = threading.Lock()
+        self._next = 0.0
+
+    def wait(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+class MetadataClient:
+    """
+    Pooled HTTP client for AcoustID + MusicBrainz.
+    - One requests.Session with a bounded connection pool, timeouts on every call.
+    - AcoustID lookups are batched (fingerprint.N / duration.N in one POST) and
+      rate limited to the public API limit.
+    - MusicBrainz recording lookups are answered by the offline index when one is
+      imported, else run concurrently against LOCAL_MB_SERVER; they are rate
+      limited only when that server is not on this machine.
+    """
+    ACOUSTID_URL = "https://api.acoustid.org/v2/lookup"
+    ACOUSTID_RATE = 3.0       # Requests/second allowed by the public AcoustID API
+    MUSICBRAINZ_RATE = 1.0    # Requests/second allowed by musicbrainz.org
+    USER_AGENT = "AutoSplitTagger/1.0 ( contact@antigravity.cool )"
+
+    def __init__(self, api_key, mb_server, batch_size=10, concurrency=4, timeout=(5, 30), cache=None, offline=None):
+        self.api_key = api_key
+        self.mb_server = mb_server.rstrip('/')
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.timeout = timeout
+        # Optional MetadataCache: recording lookups are served from it when fresh
+        self.cache = cache
+        # Optional OfflineMusicBrainz: recordings found there never reach the web service
+        self.offline = offline
+        
+        self.session = requests.Session()
+        # Headers for "Good Citizen" API usage
+        self.session.headers["User-Agent"] = self.USER_AGENT
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=max(2, concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        
+        self.acoustid_limiter = RateLimiter(self.ACOUSTID_RATE)
+        host = urlparse(self.mb_server).hostname or ""
+        is_local = host in ("127.0.0.1", "localhost", "::1")
+        self.mb_limiter = None if is_local else RateLimiter(self.MUSICBRAINZ_RATE)
+
+    def close(self):
+        self.session.close()
+
+    # --- AcoustID ---
+    def lookup_acoustid(self, items, answered=None):
+        """
+        items = [(duration, fingerprint)] (None entries are skipped).
+        Returns a list of recording MBIDs (or None) aligned with items.
+        If answered is a list, it is filled with True where AcoustID actually
+        replied (so None means "no match" rather than a failed request).
+        """
+        mbids = [None] * len(items)
+        if answered is not None:
+            answered[:] = [False] * len(items)
+        indexed = [(i, item) for i, item in enumerate(items) if item and item[1]]
+        batches = [indexed[pos:pos + self.batch_size] for pos in range(0, len(indexed), self.batch_size)]
+        
+        def run(batch):
+            found = self._lookup_acoustid_batch([item for _, item in batch])
+            if found is None:
+                return
+            for (i, _), mbid in zip(batch, found):
+                mbids[i] = mbid
+                if answered is not None:
+                    answered[i] = True
+        
+        with ThreadPoolExecutor(max_workers=max(1, min(self.concurrency, len(batches)))) as pool:
+            list(pool.map(run, batches))
+        return mbids
+
+    def _lookup_acoustid_batch(self, batch):
+        """ MBIDs (or None) aligned with batch; None if the request failed """
+        data = {
+            "client": self.api_key,
+            "meta": "recordingids",
+            "format": "json"
+        }
+        if len(batch) == 1:
+            data["duration"] = int(batch[0][0])
+            data["fingerprint"] = batch[0][1]
+        else:
+            for n, (duration, fingerprint) in enumerate(batch):
+                data[f"duration.{n}"] = int(duration)
+                data[f"fingerprint.{n}"] = fingerprint
+        
+        self.acoustid_limiter.wait()
+        try:
+            r = self.session.post(self.ACOUSTID_URL, data=data, timeout=self.timeout)
+            result = r.json()
+        except Exception as e:
+            print(f"AcoustID lookup error: {e}")
+            return None
+        
+        if result.get('status') != 'ok':
+            print(f"AcoustID error: {result.get('error')}")
+            return None
+        
+        # Batch responses list one entry per fingerprint with its index
+        if 'fingerprints' in result:
+            per_index = {entry.get('index', n): entry.get('results', []) for n, entry in enumerate(result['fingerprints'])}
+        else:
+            per_index = {0: result.get('results', [])}
+        return [self._first_recording(per_index.get(n, [])) for n in range(len(batch))]
+
+    @staticmethod
+    def _first_recording(results):
+        for match in results:
+            for recording in match.get('recordings', []):
+                if recording.get('id'):
+                    return recording['id']
+        return None
+
+    # --- MusicBrainz ---
+    def lookup_recording(self, mb_recording_id):
+        """ Recording metadata from the cache, the offline index or the MusicBrainz web service, or None """
+        if self.cache:
+            cached = self.cache.get_recording(mb_recording_id)
+            if cached:
+                return cached
+        if self.offline:
+            metadata = self.offline.lookup_recording(mb_recording_id)
+            if metadata:
+                return metadata
+        # http://127.0.0.1:5000/ws/2/recording/MBID?inc=releases+artists&fmt=json
+        mb_url = f"{self.mb_server}/ws/2/recording/{mb_recording_id}"
+        mb_params = {
+            "inc": "releases+artists+media",
+            "fmt": "json"
+        }
+        if self.mb_limiter:
+            self.mb_limiter.wait()
+        try:
+            r_mb = self.session.get(mb_url, params=mb_params, timeout=self.timeout)
+            if r_mb.status_code != 200:
+                # 404 / 503 bodies are JSON too: never parse (or cache) them as a recording
+                print(f"MusicBrainz lookup error: HTTP {r_mb.status_code} for {mb_recording_id}")
+                return None
+            mb_data = r_mb.json()
+        except Exception as e:
+            print(f"MusicBrainz lookup error: {e}")
+            return None
+        if not isinstance(mb_data, dict) or not mb_data.get('title'):
+            print(f"MusicBrainz lookup error: no recording in the response for {mb_recording_id}")
+            return None
+        metadata = self.parse_recording(mb_data, mb_recording_id)
+        if self.cache:
+            self.cache.put_recording(mb_recording_id, metadata)
+        return metadata
+
+    @staticmethod
+    def parse_recording(mb_data, mb_recording_id):
+        # Extract basic tags
+        title = mb_data.get('title', 'Unknown')
+        artist = mb_data['artist-credit'][0]['artist']['name'] if mb_data.get('artist-credit') else 'Unknown'
+        album = 'Unknown'
+        if mb_data.get('releases'):
+            album = mb_data['releases'][0]['title']
+        
+        return {
+            "title": title,
+            "artist": artist,
+            "album": album,
+            "mbid": mb_recording_id
+        }
+
+    def lookup_recordings(self, mbids):
+        """ Concurrent MusicBrainz lookups; returns metadata aligned with mbids """
+        unique = sorted({m for m in mbids if m})
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency)) as pool:
+            found = dict(zip(unique, pool.map(self.lookup_recording, unique)))
+        return [found.get(m) if m else None for m in mbids]
+
+    # --- Disc TOC ---
+    def lookup_disc(self, toc):
+        """
+        Releases matching a DiscTOC: cache, then the offline index (exact DiscID,
+        then fuzzy TOC), then /ws/2/discid with the TOC as fuzzy fallback.
+        Each release is a dict with the matching medium's tracklist (see mb_offline).
+        """
+        discid = toc.musicbrainz_id()
+        if self.cache:
+            cached = self.cache.get_disc(discid)
+            if cached is not None:
+                return cached
+        releases = []
+        if self.offline:
+            releases = self.offline.lookup_discid(discid) or self.offline.lookup_toc(toc.offsets, toc.leadout)
+        if not releases:
+            releases = self._lookup_disc_web(discid, toc)
+            if releases is None:
+                # Request failed: nothing to cache
+                return []
+        if self.cache:
+            self.cache.put_disc(discid, releases)
+        return releases
+
+    def _lookup_disc_web(self, discid, toc):
+        """ Releases from /ws/2/discid ([] = no match), or None if the request failed """
+        url = f"{self.mb_server}/ws/2/discid/{discid}"
+        params = {
+            "toc": toc.toc_string(),
+            "inc": "recordings+artist-credits",
+            "fmt": "json"
+        }
+        if self.mb_limiter:
+            self.mb_limiter.wait()
+        try:
+            r = self.session.get(url, params=params, timeout=self.timeout)
+            if r.status_code == 404:
+                return []
+            if r.status_code != 200:
+                # Server error / rate limited: not a "no match" to cache
+                print(f"MusicBrainz disc lookup error: HTTP {r.status_code}")
+                return None
+            data = r.json()
+        except Exception as e:
+            print(f"MusicBrainz disc lookup error: {e}")
+            return None
+        releases = data.get('releases') or data.get('release-list') or []
+        parsed = (self.parse_disc_release(release, discid, len(toc.offsets)) for release in releases)
+        return [release for release in parsed if release]
+
+    @staticmethod
+    def parse_disc_release(release, discid, track_count):
+        """ Web service release JSON -> release dict for the medium holding discid """
+        media = release.get('media') or []
+        medium = next((m for m in media if any(d.get('id') == discid for d in m.get('discs') or [])), None)
+        if medium is None:
+            medium = next((m for m in media if len(m.get('tracks') or []) == track_count), None)
+        if medium is None:
+            return None
+        release_artist = credit_name(release.get('artist-credit'))
+        tracks = []
+        for track in medium.get('tracks') or []:
+            recording = track.get('recording') or {}
+            tracks.append({
+                "position": track.get('position'),
+                "number": track.get('number'),
+                "title": track.get('title') or recording.get('title'),
+                "artist": credit_name(track.get('artist-credit')) or credit_name(recording.get('artist-credit')) or release_artist,
+                "length": track.get('length') or recording.get('length'),
+                "recording_mbid": recording.get('id')
+            })
+        return {
+            "mbid": release.get('id'),
+            "title": release.get('title', 'Unknown'),
+            "artist": release_artist,
+            "date": release.get('date'),
+            "barcode": release.get('barcode'),
+            "medium": medium.get('position') or 1,
+            "media_count": len(media),
+            "tracks": tracks
+        }
+
+    @staticmethod
+    def track_metadata(release, track):
+        """ Tags for one track of a release dict (same keys as lookup_recording) """
+        return {
+            "title": track['title'],
+            "artist": track['artist'] or release['artist'] or 'Unknown',
+            "album": release['title'],
+            "mbid": track['recording_mbid'],
+            "albumartist": release['artist'],
+            "date": release['date'],
+            "tracknumber": track['number'] or str(track['position']),
+            "discnumber": release['medium'],
+            "release_mbid": release['mbid']
+        }
+
+    # --- Pipeline ---
+    def lookup(self, duration, fingerprint):
+        """ Single track: AcoustID -> MusicBrainz """
+        mbid = self.lookup_acoustid([(duration, fingerprint)])[0]
+        if not mbid:
+            return None
+        print(f"Found AcoustID match -> MBID: {mbid}")
+        return self.lookup_recording(mbid)
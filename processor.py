@@ -1,12 +1,389 @@
 ﻿import os
+import sys
 import subprocess
 import json
 import re
-import requests
+import hashlib
 import struct
+import mmap
 import time
+import threading
+import shutil
+import tempfile
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from mutagen import File
 import mutagen.flac
+from silence import SilenceAnalyzer, LoudnessEnvelope, tracks_from_silences
+from metadata import MetadataClient
+from cache import MetadataCache, audio_content_hash, read_flac_streaminfo
+from disctoc import DiscTOC
+from cuesheet import CueSheet, CueError, FRAMES_PER_SECOND
+from mb_offline import OfflineMusicBrainz
+from journal import JobJournal
+from tools import ToolRegistry
+
+try:
+    # Optional: in-process FLAC encoding for raw CDDA (pip install soundfile)
+    import soundfile
+except (ImportError, OSError):
+    soundfile = None
+
+# Raw audio CD sector: 588 stereo s16le frames = 1/75 s
+CDDA_SECTOR_SIZE = 2352
+
+def get_app_data_dir():
+    """
+    Per-user folder for persistent caches/indexes (created on demand).
+    Override with the AUTOSPLITTAGGER_HOME environment variable.
+    """
+    path = os.environ.get("AUTOSPLITTAGGER_HOME")
+    if not path:
+        if sys.platform.startswith('win'):
+            base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+            path = os.path.join(base, "AutoSplitTagger")
+        else:
+            base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+            path = os.path.join(base, "autosplittagger")
+    os.makedirs(path, exist_ok=True)
+    return path
+
+_tool_registry = None
+_tool_registry_lock = threading.Lock()
+
+def get_tool_registry():
+    """ Process-wide ToolRegistry, cached in <app data dir>/tools.json """
+    global _tool_registry
+    with _tool_registry_lock:
+        if _tool_registry is None:
+            _tool_registry = ToolRegistry(os.path.join(get_app_data_dir(), "tools.json"))
+        return _tool_registry
+
+class NRGReader:
+    """
+    Memory-maps a disc image (NRG, raw BIN, ISO) once and hands out zero-copy
+    memoryview slices of byte/sector ranges. Slices can be shared by worker
+    threads (no file position) and written to pipes/files without copying.
+    Release slices before close(); use as a context manager.
+    """
+    CHUNK_SIZE = 1024 * 1024  # 1MB
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self.size = os.fstat(self._file.fileno()).st_size
+        self._map = None
+        self._view = memoryview(b'')
+        if self.size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+
+    def view(self, offset, length):
+        """ Zero-copy slice of [offset, offset + length) (clipped to the file) """
+        if offset < 0:
+            offset += self.size
+        return self._view[offset:offset + length]
+
+    def sectors(self, start_sector, end_sector, sector_size=CDDA_SECTOR_SIZE, base_offset=0):
+        """ Zero-copy slice of sectors [start_sector, end_sector) """
+        return self.view(base_offset + start_sector * sector_size, (end_sector - start_sector) * sector_size)
+
+    def track_pcm(self, track):
+        """
+        Raw CDDA of an NRGTrack (INDEX 01 to end). 2352-byte sectors are a zero-copy
+        slice; 2448-byte sectors have their 96-byte subchannel stripped (one copy).
+        """
+        view = self.view(track.start_offset, track.end_offset - track.start_offset)
+        if track.sector_size == CDDA_SECTOR_SIZE:
+            return view
+        size = track.sector_size
+        return b''.join(view[pos:pos + CDDA_SECTOR_SIZE] for pos in range(0, len(view) - size + 1, size))
+
+    def iter_chunks(self, offset, length, chunk_size=CHUNK_SIZE):
+        """ Yields consecutive zero-copy slices of [offset, offset + length) """
+        return iter_chunks(self.view(offset, length), chunk_size)
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                # A caller still holds a slice; the map is freed with it
+                pass
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def iter_chunks(buffer, chunk_size=NRGReader.CHUNK_SIZE):
+    """ Yields consecutive zero-copy slices of a bytes-like buffer """
+    view = memoryview(buffer)
+    for pos in range(0, len(view), chunk_size):
+        yield view[pos:pos + chunk_size]
+
+def pcm_md5(buffer):
+    """ MD5 of whole 16-bit stereo frames of raw CDDA = the FLAC STREAMINFO MD5 of its encode """
+    view = memoryview(buffer)
+    view = view[:len(view) - (len(view) % 4)]
+    digest = hashlib.md5()
+    for chunk in iter_chunks(view):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+# FICLONERANGE ioctl (Linux btrfs/XFS/...): share extents between files instead of copying
+FICLONERANGE = 0x4020940d
+# SACD Master TOC ('SACDMTOC') sits in 2048-byte sector 510 of the disc image
+SACD_MASTER_TOC_OFFSET = 510 * 2048
+
+def clone_file_range(src, dst, length):
+    """
+    Reflinks the first length bytes of open file src into empty file dst (no data
+    written). Extents are cloned in whole 64 KiB units; the unaligned tail is copied.
+    Returns False where the filesystem/OS can't share extents (dst left empty).
+    """
+    try:
+        import fcntl
+    except ImportError:
+        return False
+    aligned = length - length % 65536
+    try:
+        if aligned:
+            fcntl.ioctl(dst.fileno(), FICLONERANGE, struct.pack('qQQQ', src.fileno(), 0, aligned, 0))
+        src.seek(aligned)
+        dst.seek(aligned)
+        dst.write(src.read(length - aligned))
+        return True
+    except OSError:
+        dst.truncate(0)
+        return False
+
+def is_sacd_image(path):
+    """ True if the file holds a 2048-byte sector SACD image from offset 0 (ISO, or an NRG's payload) """
+    try:
+        with open(path, 'rb') as f:
+            f.seek(SACD_MASTER_TOC_OFFSET)
+            return f.read(8) == b'SACDMTOC'
+    except OSError:
+        return False
+
+# One NRG track as described by the DAO/ETN chunks (offsets are absolute file offsets)
+NRGTrack = namedtuple('NRGTrack', ['number', 'mode', 'sector_size', 'pregap_offset',
+                                   'start_offset', 'end_offset', 'is_audio', 'isrc'])
+
+class NRGIndex:
+    """
+    Nero image chunk table parsed in one walk: NER5/NERO footer, CUEX/CUES,
+    DAOX/DAOI (per-track file offsets + sector size), ETN2/ETNF, SINF, MTYP, CDTX.
+    Use NRGIndex.load(path): results are cached by path + mtime + size.
+    """
+    # DAO/ETN sector sizes that carry CD audio (2448 = 2352 audio + 96 subchannel)
+    AUDIO_SECTOR_SIZES = (2352, 2448)
+    # DAO mode codes for audio tracks (used when no CUE control byte is available):
+    # 0x07 audio, 0x10 audio + subchannel (0x11 is Mode 2 raw + subchannel: data)
+    DAO_AUDIO_MODES = (0x07, 0x10)
+    # ETNF/ETN2 mode -> sector size; only modes 7 and 16 are audio (6 and 17 are Mode 2 raw)
+    ETN_SECTOR_SIZES = {0: 2048, 3: 2336, 6: 2352, 7: 2352, 16: 2448, 17: 2448}
+    ETN_AUDIO_MODES = (7, 16)
+
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, path):
+        self.path = path
+        self.version = None        # 'NER5' or 'NERO', None if not an NRG
+        self.chunk_offset = 0      # Start of the chunk table = end of the image payload
+        self.file_size = 0
+        self.cue_entries = []      # [(adr_ctl, track, index, lba)]
+        self.tracks = []           # [NRGTrack]
+        self.sessions = []         # Track count per session (SINF)
+        self.media_type = None     # MTYP
+        self.upc = ""
+        self.cdtext = {}           # {track_no: {'title': str, 'performer': str, ...}}, 0 = album
+        self._parse()
+
+    @classmethod
+    def load(cls, path):
+        """ Returns the cached index for path, re-parsing only if mtime/size changed """
+        key = os.path.abspath(path)
+        st = os.stat(path)
+        with cls._cache_lock:
+            cached = cls._cache.get(key)
+            if cached and cached[0] == (st.st_mtime_ns, st.st_size):
+                return cached[1]
+        index = cls(path)
+        with cls._cache_lock:
+            cls._cache[key] = ((st.st_mtime_ns, st.st_size), index)
+        return index
+
+    def audio_tracks(self):
+        return [t for t in self.tracks if t.is_audio]
+
+    def _parse(self):
+        with open(self.path, 'rb') as f:
+            f.seek(0, 2)
+            self.file_size = f.tell()
+            if self.file_size < 12:
+                return
+            
+            # NER5 footer: [4s tag][8b offset]; NERO footer (v1): [4s tag][4b offset]
+            f.seek(-12, 2)
+            footer = f.read(12)
+            if footer[:4] == b'NER5':
+                self.version = 'NER5'
+                self.chunk_offset = struct.unpack('>Q', footer[4:])[0]
+            elif footer[4:8] == b'NERO':
+                self.version = 'NERO'
+                self.chunk_offset = struct.unpack('>I', footer[8:])[0]
+            
+            if not self.version or not 0 < self.chunk_offset < self.file_size:
+                self.version = None
+                self.chunk_offset = self.file_size
+                return
+            
+            f.seek(self.chunk_offset)
+            table = f.read(self.file_size - self.chunk_offset)
+        
+        dao_blocks = []
+        etn_blocks = []
+        cdtext_packs = b''
+        pos = 0
+        while pos + 8 <= len(table):
+            chunk_id, chunk_size = struct.unpack_from('>4sI', table, pos)
+            data = table[pos + 8:pos + 8 + chunk_size]
+            pos += 8 + chunk_size
+            
+            if chunk_id == b'END!':
+                break
+            elif chunk_id in (b'CUEX', b'CUES'):
+                self._parse_cue_chunk(data, chunk_id == b'CUEX')
+            elif chunk_id in (b'DAOX', b'DAOI'):
+                dao_blocks.append(self._parse_dao_chunk(data, chunk_id == b'DAOX'))
+            elif chunk_id in (b'ETN2', b'ETNF'):
+                etn_blocks.extend(self._parse_etn_chunk(data, chunk_id == b'ETN2', len(etn_blocks) + 1))
+            elif chunk_id in (b'SINF', b'SIN2') and len(data) >= 4:
+                self.sessions.append(struct.unpack_from('>I', data)[0])
+            elif chunk_id == b'MTYP' and len(data) >= 4:
+                self.media_type = struct.unpack_from('>I', data)[0]
+            elif chunk_id == b'CDTX':
+                cdtext_packs += data
+        
+        # Track control bits from the CUE chunk: bit 0x40 = data track
+        controls = {}
+        for adr_ctl, track, index, lba in self.cue_entries:
+            if 0 < track < 100:
+                controls.setdefault(track, adr_ctl)
+        
+        # DAO images describe every track; ETN (track-at-once) is the alternative
+        blocks = [block for session in dao_blocks for block in session] or etn_blocks
+        for number, mode, sector_size, pregap, start, end, isrc in blocks:
+            if number in controls:
+                is_audio = not controls[number] & 0x40
+            else:
+                is_audio = mode in (self.DAO_AUDIO_MODES if dao_blocks else self.ETN_AUDIO_MODES)
+            is_audio = is_audio and sector_size in self.AUDIO_SECTOR_SIZES
+            self.tracks.append(NRGTrack(number, mode, sector_size, pregap, start, end, is_audio, isrc))
+        
+        if not self.tracks:
+            self._tracks_from_cue()
+        
+        if cdtext_packs:
+            self.cdtext = self._parse_cdtext(cdtext_packs)
+
+    def _parse_cue_chunk(self, data, extended):
+        # Each entry 8 bytes: [ADR/CTL][Track BCD][Index BCD][0][LBA (CUEX) or 0,M,S,F (CUES)]
+        for pos in range(0, len(data) - 7, 8):
+            adr_ctl, track, index = data[pos], bcd_to_int(data[pos + 1]), bcd_to_int(data[pos + 2])
+            if data[pos + 1] == 0xAA:
+                track = 0xAA  # Lead-out
+            if extended:
+                lba = struct.unpack_from('>i', data, pos + 4)[0]
+            else:
+                m, s, fr = (bcd_to_int(b) for b in data[pos + 5:pos + 8])
+                lba = (m * 60 + s) * 75 + fr - 150
+            self.cue_entries.append((adr_ctl, track, index, lba))
+
+    def _parse_dao_chunk(self, data, extended):
+        # Header (22 bytes): [size 4][UPC 13][pad 1][toc type 2][first track 1][last track 1]
+        # Track (DAOX 42 / DAOI 30 bytes): [ISRC 12][sector size 2][mode 1][3][pregap][start][end]
+        blocks = []
+        if len(data) < 22:
+            return blocks
+        self.upc = data[4:17].rstrip(b'\0').decode('ascii', errors='ignore')
+        first_track = data[20] or 1
+        fmt = '>12sHB3xQQQ' if extended else '>12sHB3xIII'
+        entry_size = struct.calcsize(fmt)
+        for i, pos in enumerate(range(22, len(data) - entry_size + 1, entry_size)):
+            isrc, sector_size, mode, pregap, start, end = struct.unpack_from(fmt, data, pos)
+            blocks.append((first_track + i, mode, sector_size, pregap, start, end,
+                           isrc.rstrip(b'\0').decode('ascii', errors='ignore')))
+        return blocks
+
+    def _parse_etn_chunk(self, data, extended, first_track):
+        # ETNF entry (20 bytes): [offset 4][size 4][mode 4][start lba 4][4]
+        # ETN2 entry (32 bytes): [offset 8][size 8][mode 4][start lba 4][8]
+        fmt = '>QQII8x' if extended else '>IIII4x'
+        entry_size = struct.calcsize(fmt)
+        blocks = []
+        for i, pos in enumerate(range(0, len(data) - entry_size + 1, entry_size)):
+            offset, size, mode, lba = struct.unpack_from(fmt, data, pos)
+            sector_size = self.ETN_SECTOR_SIZES.get(mode, CDDA_SECTOR_SIZE)
+            blocks.append((first_track + i, mode, sector_size, offset, offset, offset + size, ""))
+        return blocks
+
+    def _tracks_from_cue(self):
+        """ Last resort (no DAO/ETN chunk): INDEX 01 LBAs of a raw 2352-byte image starting at LBA 0 """
+        starts = {}
+        leadout = None
+        for adr_ctl, track, index, lba in self.cue_entries:
+            if track == 0xAA:
+                leadout = lba
+            elif index == 1 and 0 < track < 100:
+                starts[track] = (lba, adr_ctl)
+        numbers = sorted(starts)
+        for i, number in enumerate(numbers):
+            lba, adr_ctl = starts[number]
+            end_lba = starts[numbers[i + 1]][0] if i + 1 < len(numbers) else leadout
+            if end_lba is None or end_lba <= lba or lba < 0:
+                continue
+            self.tracks.append(NRGTrack(number, None, CDDA_SECTOR_SIZE, lba * CDDA_SECTOR_SIZE,
+                                        lba * CDDA_SECTOR_SIZE, end_lba * CDDA_SECTOR_SIZE,
+                                        not adr_ctl & 0x40, ""))
+
+    @staticmethod
+    def _parse_cdtext(packs):
+        """
+        CD-TEXT packs (18 bytes): [type][track][seq][block/charpos][text 12][crc 2].
+        Only block 0 is read; strings are NUL separated, TAB repeats the previous one.
+        """
+        fields = {0x80: 'title', 0x81: 'performer', 0x82: 'songwriter', 0x83: 'composer',
+                  0x84: 'arranger', 0x85: 'message'}
+        streams = {}
+        for pos in range(0, len(packs) - 17, 18):
+            pack_type, track, block = packs[pos], packs[pos + 1] & 0x7F, (packs[pos + 3] >> 4) & 0x07
+            if pack_type not in fields or block != 0:
+                continue
+            first_track, text = streams.setdefault(pack_type, (track, bytearray()))
+            text += packs[pos + 4:pos + 16]
+        
+        cdtext = {}
+        for pack_type, (first_track, text) in streams.items():
+            previous = ""
+            for offset, raw in enumerate(bytes(text).split(b'\0')):
+                value = raw.decode('latin-1').strip()
+                if value == '\t':
+                    value = previous
+                previous = value
+                if value:
+                    cdtext.setdefault(first_track + offset, {})[fields[pack_type]] = value
+        return cdtext
+
+def bcd_to_int(value):
+    return (value >> 4) * 10 + (value & 0x0F)
 
 class MountManager:
     @staticmethod
@@ -75,62 +452,119 @@ class DiscInspector:
         return "DATA"
 
 class AudioProcessor:
+    # Metadata keys -> tag names (Vorbis comment names; EasyID3/EasyMP4 share them)
+    TAG_FIELDS = {
+        'title': 'title',
+        'artist': 'artist',
+        'album': 'album',
+        'albumartist': 'albumartist',
+        'tracknumber': 'tracknumber',
+        'tracktotal': 'tracktotal',
+        'discnumber': 'discnumber',
+        'date': 'date',
+        'genre': 'genre',
+        'mbid': 'musicbrainz_trackid',
+        'release_mbid': 'musicbrainz_albumid',
+        'isrc': 'isrc',
+        'replaygain_track_gain': 'replaygain_track_gain',
+        'replaygain_track_peak': 'replaygain_track_peak',
+        'replaygain_album_gain': 'replaygain_album_gain',
+        'replaygain_album_peak': 'replaygain_album_peak'
+    }
+    # Padding reserved in FLAC files so later retags are rewritten in place
+    TAG_PADDING = 16384
+    # Front cover images picked up from the source folder (first match wins)
+    COVER_NAMES = ('cover', 'folder', 'front')
+    COVER_EXTS = {'.jpg': 'image/jpeg', '.jpeg': 'image/jpeg', '.png': 'image/png'}
+    # Seconds between scratch folder scans while sacd_extract runs
+    SACD_POLL_INTERVAL = 0.5
+    # Seconds after which a leftover NRG view folder (killed run) is removed
+    NRG_VIEW_MAX_AGE = 24 * 3600
+    # DSD -> PCM targets: the 44.1 kHz family (DSD64 = 64 x 44100) needs no fractional
+    # resampling; FLAC takes 16 bit (s16) or 24 bit (s32 container)
+    SACD_PCM_RATES = (44100, 88200, 176400, 352800)
+    SACD_BIT_DEPTHS = (16, 24)
+
     def __init__(self):
-        # Paths verification for Bundled App (PyInstaller) vs Dev Mode
-        self.FFMPEG_PATH = self.get_resource_path("ffmpeg.exe")
-        self.FPCALC_PATH = self.get_resource_path("fpcalc.exe")
-        # sacd_extract is expected in the same location
+        # External tools are resolved on first use (see tools.py); assigning
+        # FFMPEG_PATH / FPCALC_PATH overrides the discovered binary
+        self._tool_paths = {}
+        
+        # Tracks encoded in parallel by the NRG worker pool
+        self.max_workers = os.cpu_count() or 1
+        # FLAC encoder for raw CDDA ranges: "soundfile" (in-process) or "ffmpeg" (subprocess)
+        self.flac_backend = "soundfile" if soundfile is not None and sys.byteorder == 'little' else "ffmpeg"
+        # SACD DSD -> PCM target (e.g. 88200 / 24); None keeps ffmpeg's default (DSD rate / 8).
+        # The decimation rate dominates the conversion cost
+        self.sacd_pcm_rate = None
+        self.sacd_bit_depth = None
+        # Fast disk (tmpfs/SSD) for intermediate SACD files; None = system temp dir
+        self.scratch_dir = None
+        # Cap in bytes on DSFs waiting in scratch (None = whole-disc extraction, no cap)
+        self.sacd_scratch_limit = None
+        # Measure and write ReplayGain (track + album) when tagging a disc
+        self.replaygain = False
+        # Skip tracks/jobs the journal records as finished (resume after a crash or cancel)
+        self.resume = True
+        self._journal = None
+        # Loudness envelopes for silence re-tuning: {(path, mtime_ns, size): LoudnessEnvelope}
+        self._envelopes = {}
         
         self.LOCAL_MB_SERVER = "http://127.0.0.1:5000"
         self.ACOUSTID_API_KEY = "cSpUJKpD"
+        # Offline MusicBrainz index (see mb_offline.py); None = <app data dir>/musicbrainz.db
+        self.MB_OFFLINE_DB = None
+        self._metadata_client = None
+        self._metadata_cache = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def tools(self):
+        return get_tool_registry()
 
     def get_resource_path(self, relative_path):
-        """ Get absolute path to resource, works for dev and for PyInstaller """
-        import sys
-        import shutil
-        
-        if hasattr(sys, '_MEIPASS'):
-            # PyInstaller creates a temp folder and stores path in _MEIPASS
-            return os.path.join(sys._MEIPASS, relative_path)
-        
-        # Dev Mode: Hardcoded paths or relative
-        # Backup: Look in ./bin folder relative to Main Script
-        base_path = os.path.dirname(os.path.abspath(__file__))
-        bin_dir = os.path.join(base_path, "bin")
-        
-        dev_map = {
-            "ffmpeg.exe": os.path.join(bin_dir, "ffmpeg.exe"),
-            "fpcalc.exe": os.path.join(bin_dir, "fpcalc.exe"),
-            "sacd_extract.exe": os.path.join(bin_dir, "sacd_extract.exe")
-        }
-        
-        bundled_path = dev_map.get(relative_path, os.path.join(os.path.abspath("."), relative_path))
-        
-        # Fallback to system PATH if bundled doesn't work
-        if relative_path in ["ffmpeg.exe", "fpcalc.exe"]:
-            # Test if bundled version works
-            if os.path.exists(bundled_path):
-                try:
-                    result = subprocess.run([bundled_path, "-version"], 
-                                          capture_output=True, timeout=2)
-                    if result.returncode == 0:
-                        return bundled_path  # Works!
-                except:
-                    pass  # Bundled version failed
-            
-            # Try system version
-            system_path = shutil.which(relative_path.replace(".exe", ""))
-            if system_path:
-                print(f"Using system {relative_path}: {system_path}")
-                return system_path
-        
-        return bundled_path
+        """ Get absolute path to resource, works for dev and for PyInstaller (bundled first, then PATH) """
+        if relative_path in self._tool_paths:
+            return self._tool_paths[relative_path]
+        return self.tools.path(relative_path)
+
+    @property
+    def FFMPEG_PATH(self):
+        return self.get_resource_path("ffmpeg.exe")
+
+    @FFMPEG_PATH.setter
+    def FFMPEG_PATH(self, path):
+        self._tool_paths["ffmpeg.exe"] = path
+
+    @property
+    def FPCALC_PATH(self):
+        return self.get_resource_path("fpcalc.exe")
+
+    @FPCALC_PATH.setter
+    def FPCALC_PATH(self, path):
+        self._tool_paths["fpcalc.exe"] = path
+
+    def ffmpeg_has_filter(self, name):
+        """ True unless the discovered ffmpeg is known to lack the filter (overridden paths are trusted) """
+        if "ffmpeg.exe" in self._tool_paths:
+            return True
+        filters = self.tools.capabilities("ffmpeg.exe").get('filters')
+        return not filters or name in filters
 
     def detect_silence(self, file_path, db_threshold=-40, min_duration=2.0):
         """
         Scans file for silence and returns a list of (start, end) timestamps for TRACKS (audio segments).
+        Uses the cached NumPy loudness envelope (one streaming decode per file, duration
+        included) when NumPy is installed, otherwise parses ffmpeg silencedetect output.
         """
         print(f"Scanning for silence in {file_path}...")
+        if SilenceAnalyzer.available():
+            try:
+                # Envelope is decoded once per file version; re-tuning is just an evaluation
+                return self.get_loudness_envelope(file_path).tracks(db_threshold, min_duration)
+            except Exception as e:
+                print(f"PCM silence analysis failed ({e}). Falling back to silencedetect...")
+        
         command = [
             self.FFMPEG_PATH,
             "-i", file_path,
@@ -163,51 +597,47 @@ class AudioProcessor:
                 if match:
                     silence_ends.append(float(match.group(1)))
 
-        # Logic: Audio is what happens BETWEEN silence_end of previous and silence_start of next.
-        # First track starts at 0.0
-        
-        tracks = []
-        current_start = 0.0
-        
-        # Zip silences to find breaks
-        # We need to handle the case where silence_starts has one more item than ends (final silence) or vice versa
-        
-        # Simplified logic:
-        # Track 1: 0.0 -> silence_starts[0]
-        # Track 2: silence_ends[0] -> silence_starts[1]
-        # ...
-        
-        # Sort just in case
-        silence_starts.sort()
-        silence_ends.sort()
-        
-        # Filter out silence at very beginning (if any)
-        if silence_ends and silence_ends[0] < 1.0:
-            current_start = silence_ends[0]
-            silence_ends = silence_ends[1:]
-            if silence_starts and silence_starts[0] < 1.0:
-                 silence_starts = silence_starts[1:]
+        return self.tracks_from_silences(silence_starts, silence_ends, self.get_duration(file_path))
 
-        count = min(len(silence_starts), len(silence_ends))
-        
-        for i in range(count):
-            gap_start = silence_starts[i]
-            gap_end = silence_ends[i]
-            
-            # Add track BEFORE this gap
-            if gap_start > current_start:
-                tracks.append((current_start, gap_start))
-            
-            # Next track starts after this gap
-            current_start = gap_end
-            
-        # Add final track (from last silence end to file duration?)
-        # We need file duration for this.
-        blocks = self.get_duration(file_path)
-        if blocks > current_start:
-              tracks.append((current_start, blocks))
-              
-        return tracks
+    def tracks_from_silences(self, silence_starts, silence_ends, duration):
+        """
+        Turns silence start/end times into (start, end) TRACK segments.
+        """
+        return tracks_from_silences(silence_starts, silence_ends, duration)
+
+    def get_loudness_envelope(self, file_path):
+        """
+        Per-window loudness envelope of file_path (one decode), cached in memory
+        and on disk by path + mtime + size. Requires NumPy.
+        """
+        st = os.stat(file_path)
+        key = (os.path.abspath(file_path), st.st_mtime_ns, st.st_size)
+        envelope = self._envelopes.get(key)
+        if envelope is None:
+            cache_dir = os.path.join(get_app_data_dir(), "envelopes")
+            analyzer = SilenceAnalyzer(self.FFMPEG_PATH)
+            envelope = LoudnessEnvelope.load_or_build(analyzer, file_path, cache_dir)
+            # Small in-memory LRU: the GUI re-tunes the same few files
+            if len(self._envelopes) >= 8:
+                self._envelopes.pop(next(iter(self._envelopes)))
+            self._envelopes[key] = envelope
+        return envelope
+
+    def sweep_silence(self, file_path, combinations):
+        """
+        Evaluates many (db_threshold, min_duration) combinations from one decode.
+        Returns {(db_threshold, min_duration): tracks}.
+        """
+        envelope = self.get_loudness_envelope(file_path)
+        return {(db, dur): envelope.tracks(db, dur) for db, dur in combinations}
+
+    def suggest_silence_params(self, file_path, target_tracks, thresholds=None, durations=None):
+        """
+        Finds the (db_threshold, min_duration) whose track count best matches target_tracks.
+        Returns (db_threshold, min_duration, tracks).
+        """
+        envelope = self.get_loudness_envelope(file_path)
+        return envelope.suggest(target_tracks, thresholds, durations)
 
     def get_duration(self, file_path):
         cmd = [self.FFMPEG_PATH, "-i", file_path]
@@ -219,21 +649,61 @@ class AudioProcessor:
             return int(h)*3600 + int(m)*60 + float(s)
         return 0.0
 
-    def split_file(self, file_path, tracks, output_dir):
+    def split_file(self, file_path, tracks, output_dir, accurate=None, single_pass=True):
         """
         Splits file into chunks.
+        Single pass (default): the source is opened once and every segment is written
+        in the same ffmpeg run.
+          accurate=True  -> decode + asegment graph + re-encode (sample-accurate cuts)
+          accurate=False -> stream copy through the segment muxer (fast, packet-accurate)
+          accurate=None  -> accurate for lossless sources (.flac/.wav), copy otherwise
+        single_pass=False keeps the legacy one-ffmpeg-per-track mode.
         """
         print(f"Splitting {len(tracks)} tracks...")
         file_name = os.path.splitext(os.path.basename(file_path))[0]
         ext = os.path.splitext(file_path)[1]
         
-        output_files = []
+        all_paths = [os.path.join(output_dir, f"{file_name} - Track {i + 1:02d}{ext}") for i in range(len(tracks))]
+        if accurate is None:
+            accurate = ext.lower() in ('.flac', '.wav')
+        if accurate and single_pass and not self.ffmpeg_has_filter("asegment"):
+            # Older ffmpeg builds: sample-accurate graph not available, stream copy instead
+            accurate = False
         
-        for i, (start, end) in enumerate(tracks):
-            track_num = i + 1
-            out_name = f"{file_name} - Track {track_num:02d}{ext}"
-            out_path = os.path.join(output_dir, out_name)
-            
+        # Incremental: outputs the journal has for this (unchanged) source and cut are kept
+        def split_range(track, mode):
+            return f"{track[0]:.6f}-{track[1]}/{mode}"
+        mode = "accurate" if accurate and single_pass else "copy"
+        # A failed single pass falls back to per-track stream copy, recorded as "copy"
+        modes = (mode, "copy") if mode != "copy" else (mode,)
+        finished = set()
+        if self.resume:
+            finished = {path for track, path in zip(tracks, all_paths)
+                        if any(self.journal.track_done(path, file_path, split_range(track, m)) for m in modes)}
+            if finished:
+                print(f"{len(finished)} of {len(tracks)} tracks up to date, skipping them.")
+        pending = [(track, path) for track, path in zip(tracks, all_paths) if path not in finished]
+        if not pending:
+            return all_paths
+        tracks = [track for track, _ in pending]
+        out_paths = [path for _, path in pending]
+        
+        if single_pass and tracks:
+            try:
+                if accurate:
+                    self._split_accurate(file_path, tracks, out_paths)
+                else:
+                    self._split_stream_copy(file_path, tracks, out_paths)
+                for track, out_path in pending:
+                    self.journal.record_track(out_path, file_path, split_range(track, mode))
+                    print(f"Generated: {os.path.basename(out_path)}")
+                return all_paths
+            except (subprocess.CalledProcessError, OSError, ValueError) as e:
+                print(f"Single-pass split failed ({e}). Falling back to per-track split...")
+        
+        output_files = sorted(finished, key=all_paths.index)
+        
+        for (start, end), out_path in zip(tracks, out_paths):
             # cmd = f'ffmpeg -i "{file_path}" -ss {start} -to {end} -c copy "{out_path}" -y'
             cmd = [
                 self.FFMPEG_PATH, "-y",
@@ -245,138 +715,255 @@ class AudioProcessor:
             ]
             
             subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            self.journal.record_track(out_path, file_path, split_range((start, end), "copy"))
             output_files.append(out_path)
-            print(f"Generated: {out_name}")
+            print(f"Generated: {os.path.basename(out_path)}")
             
-        return output_files
+        return sorted(output_files, key=all_paths.index)
+
+    def _split_accurate(self, file_path, tracks, out_paths):
+        # One decode, asegment cuts at sample level, one encoder per output
+        graph, labels = self.build_segment_graph(tracks)
+        cmd = [self.FFMPEG_PATH, "-y", "-i", file_path, "-filter_complex", graph]
+        for label, out_path in zip(labels, out_paths):
+            cmd.extend(["-map", f"[{label}]", out_path])
+        subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
 
-    def get_fingerprint(self, file_path):
+    def _split_stream_copy(self, file_path, tracks, out_paths):
+        # One demux pass through the segment muxer; pieces in gaps are deleted afterwards
+        points, pieces = self.segment_pieces(tracks)
+        ext = os.path.splitext(file_path)[1]
+        output_dir = os.path.dirname(out_paths[0])
+        temp_dir = tempfile.mkdtemp(prefix=".split_", dir=output_dir or ".")
+        try:
+            # '%' is the segment pattern escape
+            pattern = os.path.join(temp_dir.replace('%', '%%'), f"piece%04d{ext}")
+            cmd = [
+                self.FFMPEG_PATH, "-y",
+                "-i", file_path,
+                "-map", "0:a:0",
+                "-c", "copy",
+                "-f", "segment",
+                "-reset_timestamps", "1"
+            ]
+            if points:
+                cmd.extend(["-segment_times", ",".join(f"{t:.6f}" for t in points)])
+            cmd.append(pattern)
+            subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True)
+            
+            for k, out_path in zip(pieces, out_paths):
+                os.replace(os.path.join(temp_dir, f"piece{k:04d}{ext}"), out_path)
+        finally:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def get_fingerprint(self, file_path, content_hash=None):
         """
-        Runs fpcalc and returns (duration, fingerprint)
+        Returns (duration, fingerprint), from the persistent cache or by running fpcalc.
+        content_hash: audio_content_hash(file_path) when the caller already has it.
         """
+        if content_hash is None:
+            try:
+                content_hash = audio_content_hash(file_path)
+            except OSError as e:
+                print(f"Fingerprint error for {file_path}: {e}")
+                return None, None
+        cached = self.metadata_cache.get_fingerprint(content_hash)
+        if cached:
+            return cached
         cmd = [self.FPCALC_PATH, "-json", file_path]
         try:
             res = subprocess.run(cmd, stdout=subprocess.PIPE, check=True, text=True, encoding='utf-8', errors='replace')
             data = json.loads(res.stdout)
-            return data["duration"], data["fingerprint"]
         except Exception as e:
             print(f"Fingerprint error for {file_path}: {e}")
             return None, None
+        self.metadata_cache.put_fingerprint(content_hash, data["duration"], data["fingerprint"])
+        return data["duration"], data["fingerprint"]
+
+    @property
+    def journal(self):
+        """ Persistent job journal in the app data dir (opened on first use) """
+        with self._client_lock:
+            if self._journal is None:
+                self._journal = JobJournal(os.path.join(get_app_data_dir(), "jobs.db"))
+            return self._journal
+
+    @property
+    def metadata_cache(self):
+        """ Persistent fingerprint/lookup cache in the app data dir (opened on first use) """
+        with self._client_lock:
+            if self._metadata_cache is None:
+                db_path = os.path.join(get_app_data_dir(), "metadata_cache.db")
+                self._metadata_cache = MetadataCache(db_path)
+            return self._metadata_cache
+
+    @property
+    def metadata_client(self):
+        """ Shared pooled AcoustID/MusicBrainz client (created on first use) """
+        cache = self.metadata_cache
+        with self._client_lock:
+            if self._metadata_client is None:
+                offline_db = self.MB_OFFLINE_DB or os.path.join(get_app_data_dir(), "musicbrainz.db")
+                self._metadata_client = MetadataClient(self.ACOUSTID_API_KEY, self.LOCAL_MB_SERVER, cache=cache,
+                                                       offline=OfflineMusicBrainz.available(offline_db))
+            return self._metadata_client
 
     def lookup_metadata(self, duration, fingerprint):
         """
         1. Query AcoustID to get MBID.
         2. Query Local MB Server for Metadata.
         """
-        # Headers for "Good Citizen" API usage
-        headers = {
-            "User-Agent": "AutoSplitTagger/1.0 ( contact@antigravity.cool )"
-        }
-        
-        # Step 1: AcoustID (Internet)
-        acoustid_url = "https://api.acoustid.org/v2/lookup"
-        params = {
-            "client": self.ACOUSTID_API_KEY,
-            "meta": "recordingids",
-            "duration": int(duration),
-            "fingerprint": fingerprint
-        }
-        
         try:
-            r = requests.get(acoustid_url, params=params, headers=headers)
-            data = r.json()
-            if data['status'] != 'ok' or not data['results']:
-                return None
-            
-            # Get first recording ID
-            mb_recording_id = data['results'][0]['recordings'][0]['id']
-            print(f"Found AcoustID match -> MBID: {mb_recording_id}")
-
-            # Step 2: Local MusicBrainz Server (Local)
-            # http://127.0.0.1:5000/ws/2/recording/MBID?inc=releases+artists&fmt=json
-            mb_url = f"{self.LOCAL_MB_SERVER}/ws/2/recording/{mb_recording_id}"
-            mb_params = {
-                "inc": "releases+artists+media", 
-                "fmt": "json"
-            }
-            
-            r_mb = requests.get(mb_url, params=mb_params, headers=headers)
-            mb_data = r_mb.json()
-            
-            # Extract basic tags
-            title = mb_data.get('title', 'Unknown')
-            artist = mb_data['artist-credit'][0]['artist']['name'] if 'artist-credit' in mb_data else 'Unknown'
-            album = 'Unknown'
-            if 'releases' in mb_data and mb_data['releases']:
-                album = mb_data['releases'][0]['title']
-            
-            return {
-                "title": title,
-                "artist": artist,
-                "album": album,
-                "mbid": mb_recording_id
-            }
-
+            return self.metadata_client.lookup(duration, fingerprint)
         except Exception as e:
             print(f"Lookup error: {e}")
             return None
 
+    def identify_tracks(self, file_paths, jobs=None):
+        """
+        Tagging pipeline for many tracks: parallel fpcalc, batched AcoustID lookups,
+        concurrent MusicBrainz lookups over one pooled session.
+        Fingerprints, AcoustID matches (and misses) and recordings come from the
+        persistent cache when known, so a re-run makes no fpcalc or network calls.
+        Returns {file_path: metadata or None}.
+        """
+        jobs = max(1, jobs or self.max_workers)
+        cache = self.metadata_cache
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            hashes = list(pool.map(self._content_hash_or_none, file_paths))
+            fingerprints = list(pool.map(self.get_fingerprint, file_paths, hashes))
+
+        mbids = [None] * len(file_paths)
+        pending = []
+        for i, (content_hash, fp) in enumerate(zip(hashes, fingerprints)):
+            if not fp[1]:
+                continue
+            known, mbid = cache.get_acoustid(content_hash) if content_hash else (False, None)
+            if known:
+                mbids[i] = mbid
+            else:
+                pending.append(i)
+        if pending:
+            answered = []
+            found = self.metadata_client.lookup_acoustid([fingerprints[i] for i in pending], answered)
+            for i, mbid, ok in zip(pending, found, answered):
+                mbids[i] = mbid
+                # Failed requests are not cached, so they are retried next run
+                if ok and hashes[i]:
+                    cache.put_acoustid(hashes[i], mbid)
+
+        results = self.metadata_client.lookup_recordings(mbids)
+        return dict(zip(file_paths, results))
+
+    def disc_toc(self, image_path):
+        """ DiscTOC of an NRG or CUE image, or None """
+        lower = image_path.lower()
+        try:
+            if lower.endswith('.nrg'):
+                index = NRGIndex.load(image_path)
+                return DiscTOC.from_nrg(index) if index.version else None
+            if lower.endswith('.cue'):
+                sheet = CueSheet.load(image_path)
+                file_frames = []
+                for name, _ in sheet.files:
+                    source_path = self.locate_cue_source(image_path, name, len(sheet.files) == 1)
+                    seconds = self._cdda_seconds(source_path) if source_path else None
+                    if seconds is None:
+                        return None
+                    file_frames.append(round(seconds * FRAMES_PER_SECOND))
+                return DiscTOC.from_cue_sheet(sheet, file_frames)
+        except Exception as e:
+            print(f"TOC error for {image_path}: {e}")
+        return None
+
+    def _cdda_seconds(self, source_path):
+        """ Exact length of a CD image source where the format allows it (raw BIN, FLAC) """
+        if source_path.lower().endswith('.bin'):
+            return os.path.getsize(source_path) / CDDA_SECTOR_SIZE / 75
+        info = read_flac_streaminfo(source_path)
+        if info and info['sample_rate'] and info['total_samples']:
+            return info['total_samples'] / info['sample_rate']
+        return self.get_duration(source_path) or None
+
+    def identify_disc(self, toc, file_paths, jobs=None):
+        """
+        Whole-disc identification: one DiscID/TOC query resolves every track.
+        file_paths are the disc's tracks in order. Falls back to per-track
+        fingerprinting (identify_tracks) when there is no TOC, no matching
+        release, or the tracklist length differs.
+        Returns {file_path: metadata or None}.
+        """
+        if toc:
+            print(f"DiscID: {toc.musicbrainz_id()} (FreeDB {toc.freedb_id()})")
+            for release in self.metadata_client.lookup_disc(toc):
+                if len(release['tracks']) == len(file_paths):
+                    print(f"Disc match -> {release['title']} ({release['mbid']})")
+                    return {path: MetadataClient.track_metadata(release, track)
+                            for path, track in zip(file_paths, release['tracks'])}
+            print("No disc match, falling back to fingerprints.")
+        return self.identify_tracks(file_paths, jobs)
+
+    @staticmethod
+    def _content_hash_or_none(file_path):
+        try:
+            return audio_content_hash(file_path)
+        except OSError:
+            return None
+
+    def nrg_payload_size(self, nrg_path):
+        """ Bytes of image data at the start of an NRG (the chunk table follows) """
+        index = NRGIndex.load(nrg_path)
+        if index.version:
+            print(f"Found {index.version} Footer. Data Limit: {index.chunk_offset}")
+            return index.chunk_offset
+        # Fallback
+        print("No valid NER5 footer. Assuming Raw Copy or Standard ISO inside.")
+        return os.path.getsize(nrg_path)
+
+    def write_iso_view(self, nrg_path, iso_path, allow_links=True, allow_copy=True):
+        """
+        Makes iso_path show the image payload of an NRG without copying it where possible:
+          reflink  - extents shared with the NRG (exact payload size; same btrfs/XFS/ReFS volume)
+          hardlink / symlink (allow_links) - the NRG itself under an .iso name; readers
+                     that seek by sector (sacd_extract) never reach the trailing chunk table
+          copy     - last resort (allow_copy)
+        Returns the method used, or None (iso_path removed) if only a copy would do.
+        """
+        payload_size = self.nrg_payload_size(nrg_path)
+        with open(nrg_path, 'rb') as src, open(iso_path, 'wb') as dst:
+            if clone_file_range(src, dst, payload_size):
+                return "reflink"
+        if allow_links:
+            os.remove(iso_path)
+            for method, link in (("hardlink", os.link), ("symlink", os.symlink)):
+                try:
+                    link(os.path.abspath(nrg_path), iso_path)
+                    return method
+                except (OSError, NotImplementedError):
+                    pass
+        if not allow_copy:
+            if os.path.lexists(iso_path):
+                os.remove(iso_path)
+            return None
+        with NRGReader(nrg_path) as reader, open(iso_path, 'wb') as out:
+            # Write mapped slices straight to the file (no intermediate bytes objects)
+            for chunk in reader.iter_chunks(0, payload_size):
+                out.write(chunk)
+        return "copy"
+
     def convert_nrg_to_iso(self, nrg_path, output_dir):
         """
-        Parses NRG footer to find the data offset and extracts the ISO/BIN payload.
-        Returns path to the extracted .iso file.
+        Writes the ISO/BIN payload of an NRG as a standalone .iso (reflinked when the
+        filesystem allows, else copied). Returns path to the .iso file.
         """
         print(f"Converting NRG: {nrg_path}")
         try:
-            with open(nrg_path, 'rb') as f:
-                f.seek(0, 2)
-                filesize = f.tell()
-                
-                # Check footer (Last 12 bytes)
-                # NER5 footer: [4s tag][8b offset]
-                f.seek(-12, 2)
-                footer = f.read(12)
-                tag = footer[:4]
-                
-                offset = 0
-                if tag == b'NER5':
-                    offset = struct.unpack('>Q', footer[4:])[0] # Big Endian Unsigned Long Long
-                elif tag == b'NERO':
-                    # NERO footer (older): often just offset
-                    pass
-                
-                if offset > 0 and offset < filesize:
-                    print(f"Found NER5 Footer. Data Limit: {offset}")
-                else:
-                    # Fallback
-                    print("No valid NER5 footer. Assuming Raw Copy or Standard ISO inside.")
-                    offset = filesize 
-
-                # Extract
-                # User Request: ISO/FLAC result must be in same folder as Source
-                iso_name = os.path.splitext(os.path.basename(nrg_path))[0] + ".iso"
-                iso_path = os.path.join(output_dir, iso_name)
-                
-                print(f"Saving Converted ISO to: {iso_path}")
-                
-                f.seek(0)
-                with open(iso_path, 'wb') as out:
-                    # Read in chunks
-                    chunk_size = 1024 * 1024 # 1MB
-                    remaining = offset
-                    while remaining > 0:
-                        to_read = min(chunk_size, remaining)
-                        data = f.read(to_read)
-                        if not data:
-                            break
-                        out.write(data)
-                        remaining -= len(data)
-                
-                if os.path.exists(iso_path):
-                     print(f"Conversion Success. Size: {os.path.getsize(iso_path)} bytes")
-                else:
-                     print("Conversion Failed: File not created.")
-                        
+            # User Request: ISO/FLAC result must be in same folder as Source
+            iso_name = os.path.splitext(os.path.basename(nrg_path))[0] + ".iso"
+            iso_path = os.path.join(output_dir, iso_name)
+            print(f"Saving Converted ISO to: {iso_path}")
+            method = self.write_iso_view(nrg_path, iso_path, allow_links=False)
+            print(f"Conversion Success ({method}). Size: {os.path.getsize(iso_path)} bytes")
             return iso_path
         except Exception as e:
             print(f"NRG Conversion Failed: {e}")
@@ -385,68 +972,51 @@ class AudioProcessor:
     def process_iso(self, file_path, output_dir):
         """
         Input can be .iso or .nrg
-        1. If NRG -> Convert to ISO first.
-        2. Extact ISO using sacd_extract.
-        Returns: (flac_files, iso_path)
+        1. If NRG -> read its ISO payload in place through a temporary view in a
+           private folder (scratch_dir, else the app data dir): a reflink or
+           hardlink on the same volume, else a symlink. Where links fail there
+           (no symlink rights on Windows), a hardlink in a hidden folder next to
+           the NRG; a copy in the private folder as a last resort. Views left by
+           a killed run are swept after NRG_VIEW_MAX_AGE.
+        2. Extract ISO using sacd_extract, converting each DSF to FLAC as it completes.
+        Returns: (flac_files, image_path); flac_files is None if extraction failed
+        or sacd_extract stopped partway (the tracks converted so far stay journaled).
         """
-        iso_path = file_path
-        
-        # NRG HANDLER
-        if file_path.lower().endswith('.nrg'):
-            iso_path = self.convert_nrg_to_iso(file_path, output_dir)
-            if not iso_path:
-                print("Failed to convert NRG.")
-                return None, None
-            
-        print(f"Extracting ISO: {iso_path}")
-        sacd_exe = self.get_resource_path("sacd_extract.exe")
-        
-        # 1. Extract to DSF (Sony format, supports tags)
-        # sacd_extract -2 (stereo) -s (DSF) -c (convert DST) -i input.iso
-        cmd_extract = [
-            sacd_exe,
-            "-2", "-s", "-c",
-            "-i", iso_path
-        ]
-        
-        # sacd_extract unfortunately outputs to the CURRENT WORKING DIRECTORY or specific folder logic
-        # We should set CWD to output_dir for the subprocess
-        try:
-            subprocess.run(cmd_extract, cwd=output_dir, check=True, stdout=subprocess.DEVNULL)
-        except Exception as e:
-            print(f"sacd_extract failed: {e}")
-            # Do not return yet, we might want to return None, iso_path to let caller know ISO is ready but extract failed
-            return None, iso_path
-
-        # 2. Find extracted .dsf files
-        dsf_files = sorted([os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.casefold().endswith('.dsf')])
-        flac_files = []
+        if not file_path.lower().endswith('.nrg'):
+            print(f"Extracting ISO: {file_path}")
+            flac_files, extracted = self.extract_sacd(file_path, output_dir)
+            return (flac_files if extracted else None) or None, file_path
 
-        # 3. Convert DSF to FLAC
-        for dsf in dsf_files:
-            flac_name = os.path.splitext(os.path.basename(dsf))[0] + ".flac"
-            flac_path = os.path.join(output_dir, flac_name)
-            
-            print(f"Converting to FLAC: {flac_name}")
-            cmd_conv = [
-                self.FFMPEG_PATH, "-y",
-                "-i", dsf,
-                "-compression_level", "5",
-                flac_path
-            ]
-            
-            try:
-                subprocess.run(cmd_conv, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                flac_files.append(flac_path)
-                # Cleanup DSF
-                os.remove(dsf)
-            except Exception as e:
-                print(f"Failed to convert {dsf}: {e}")
-
-        if not flac_files:
-            return None, iso_path # Signal to main.py to fallback (but provide iso_path)
-
-        return flac_files, iso_path
+        iso_name = os.path.splitext(os.path.basename(file_path))[0] + ".iso"
+        private = self.scratch_dir or os.path.join(get_app_data_dir(), "nrgview")
+        folder = os.path.dirname(os.path.abspath(file_path))
+        for parent in (private, folder):
+            self.sweep_nrg_views(parent)
+        view_dir = None
+        try:
+            # The library folder is only used when no link works in the private folder
+            for parent, allow_copy in ((private, False), (folder, False), (private, True)):
+                try:
+                    os.makedirs(parent, exist_ok=True)
+                    view_dir = tempfile.mkdtemp(prefix=".nrgview_", dir=parent)
+                    iso_path = os.path.join(view_dir, iso_name)
+                    method = self.write_iso_view(file_path, iso_path, allow_copy=allow_copy)
+                except Exception as e:
+                    print(f"Failed to convert NRG: {e}")
+                    method = None
+                if method:
+                    break
+                if view_dir:
+                    shutil.rmtree(view_dir, ignore_errors=True)
+                    view_dir = None
+            if not method:
+                return None, None
+            print(f"Extracting ISO: {file_path} (NRG payload via {method})")
+            flac_files, extracted = self.extract_sacd(iso_path, output_dir, source_path=file_path)
+        finally:
+            if view_dir:
+                shutil.rmtree(view_dir, ignore_errors=True)
+        return (flac_files if extracted else None) or None, file_path
 
     # ... existing imports ...
 
@@ -460,83 +1030,48 @@ class AudioProcessor:
 
         return generated_files
 
+    def sweep_nrg_views(self, parent):
+        """ Removes .nrgview_* folders in parent older than NRG_VIEW_MAX_AGE (left by a killed run) """
+        cutoff = time.time() - self.NRG_VIEW_MAX_AGE
+        try:
+            entries = os.scandir(parent)
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                if not entry.name.startswith(".nrgview_"):
+                    continue
+                try:
+                    stale = entry.is_dir(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff
+                except OSError:
+                    continue
+                if stale:
+                    print(f"Removing stale NRG view: {entry.path}")
+                    # Only the links/copy inside are removed, never the NRG they point to
+                    shutil.rmtree(entry.path, ignore_errors=True)
+
     # --- NRG DIRECT EXTRACTION (NO MOUNT) ---
     def parse_nrg_structure(self, nrg_path):
         """
-        Parses NER5 footer and CUEX chunk to get Track Offsets.
-        Returns list of tuples: (start_sector, end_sector)
+        Returns the audio tracks of an NRG image as NRGTrack tuples
+        (file offsets + sector size from DAOX/DAOI, ETN2/ETNF or CUEX).
+        The chunk table is parsed once per file version (see NRGIndex.load).
         """
-        tracks = []
         try:
-            with open(nrg_path, 'rb') as f:
-                f.seek(0, 2)
-                file_size = f.tell()
-                f.seek(-12, 2)
-                footer = f.read(12)
-                
-                if footer[:4] != b'NER5':
-                    return []
-                
-                offset = struct.unpack('>Q', footer[4:])[0]
-                f.seek(offset)
-                
-                while f.tell() < file_size:
-                    chunk_header = f.read(8)
-                    if len(chunk_header) < 8: break
-                    chunk_id, chunk_size = struct.unpack('>4sI', chunk_header)
-                    
-                    if chunk_id == b'END!': break
-                    
-                    if chunk_id == b'CUEX':
-                        # Parse CUEX
-                        data = f.read(chunk_size)
-                        # Basic parsing logic derived from nrg_parser.py
-                        # Each entry 8 bytes: [Mode][Index][Reserved][Sector (4b)]
-                        entry_size = 8
-                        num_entries = len(data) // entry_size
-                        
-                        current_track = 1
-                        last_sector = 0
-                        
-                        # We collect Start Sectors for each Track (Index=1) -- Wait, byte 1 is Track No?
-                        # Based on nrg_parser output:
-                        # Entry 2: Index(Track?)=1, Sector=0
-                        # Entry 3: Index(Track?)=2, Sector=28141
-                        # Entry 19 (Last): Sector=222174
-                        
-                        # Let's collect all sector boundaries
-                        boundaries = []
-                        for i in range(num_entries):
-                            entry = data[i*entry_size : (i+1)*entry_size]
-                            # track_idx = entry[1]
-                            sector = struct.unpack('>I', entry[4:])[0]
-                            # Filter crazy large sectors (pre-gap)
-                            if sector < 4000000000:
-                                boundaries.append(sector)
-                        
-                        # Remove duplicates and sort
-                        boundaries = sorted(list(set(boundaries)))
-                        
-                        # Form tracks: [Start, End]
-                        # boundaries[0] -> boundaries[1] = Track 1
-                        for i in range(len(boundaries) - 1):
-                            start = boundaries[i]
-                            end = boundaries[i+1]
-                            if end > start:
-                                tracks.append((start, end))
-                                
-                    else:
-                        f.seek(chunk_size, 1)
-
+            index = NRGIndex.load(nrg_path)
         except Exception as e:
             print(f"NRG Parse Error: {e}")
             return []
-            
-        return tracks
+        
+        if not index.version:
+            return []
+        return index.audio_tracks()
 
-    def extract_nrg_direct(self, nrg_path, output_dir):
+    def extract_nrg_direct(self, nrg_path, output_dir, jobs=None):
         """
         Extracts Audio Tracks directly from NRG raw data using ffmpeg pipe.
+        Tracks are encoded by a bounded worker pool (jobs = tracks in flight,
+        defaults to self.max_workers). Returns generated files in track order.
         """
         print(f"Attempting Direct NRG Extraction (No Mount): {nrg_path}")
         tracks = self.parse_nrg_structure(nrg_path)
@@ -544,211 +1079,239 @@ class AudioProcessor:
             print("No tracks found in NRG structure.")
             return []
             
-        generated_files = []
-        nrg_file_obj = open(nrg_path, 'rb') # Keep open
+        jobs = max(1, jobs or self.max_workers)
+        base_name = os.path.splitext(os.path.basename(nrg_path))[0]
+        # Tags known up front (CD-TEXT, ISRC, numbering) and the folder's cover are written by the encoder
+        track_tags = self.nrg_track_metadata(NRGIndex.load(nrg_path), tracks)
+        cover = self.find_cover_art(os.path.dirname(nrg_path))
+        print(f"Encoding {len(tracks)} tracks with {jobs} workers...")
+        
+        journal = self.journal
+        
+        def extract(track, out_path, metadata):
+            source_range = f"{track.start_offset}-{track.end_offset}/{track.sector_size}"
+            try:
+                if self.resume and journal.track_done(out_path, nrg_path, source_range):
+                    print(f"Track {track.number} already extracted, skipping.")
+                    return out_path
+                if self._extract_nrg_track(reader, track, out_path, metadata, cover):
+                    journal.record_track(out_path, nrg_path, source_range, pcm_md5(reader.track_pcm(track)))
+                    return out_path
+            except Exception as e:
+                # One bad track (truncated image, encoder crash) must not drop the finished ones
+                print(f"Extraction Error for Track {track.number}: {e}")
+            return None
         
         try:
-            for i, (start_sector, end_sector) in enumerate(tracks):
-                track_num = i + 1
-                track_len_sectors = end_sector - start_sector
-                byte_offset = start_sector * 2352
-                byte_len = track_len_sectors * 2352
-                
-                out_name = os.path.splitext(os.path.basename(nrg_path))[0] + f" - Track {track_num:02d}.flac"
-                out_path = os.path.join(output_dir, out_name)
-                
-                print(f"Extracting T{track_num}: Offset {byte_offset}, Len {byte_len} bytes -> {out_name}")
-                
-                # Seek and Read
-                nrg_file_obj.seek(byte_offset)
-                # Read in chunks to pipe
-                
-                # FFMPEG Command: Read from Pipe, Format s16le, 44100, stereo
-                cmd = [
-                    self.FFMPEG_PATH, "-y",
-                    "-f", "s16le", "-ar", "44100", "-ac", "2",
-                    "-i", "pipe:0",
-                    "-compression_level", "5",
-                    out_path
-                ]
-                
-                proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                # Feed data
-                try:
-                    # We can define a chunk size to avoid memory overflow for large tracks
-                    # But Popen.communicate reads all at once if passed?
-                    # Better: write to stdin in loop
-                    
-                    bytes_written = 0
-                    chunk_size = 65536
-                    while bytes_written < byte_len:
-                        to_read = min(chunk_size, byte_len - bytes_written)
-                        data = nrg_file_obj.read(to_read)
-                        if not data: break
-                        try:
-                            proc.stdin.write(data)
-                            bytes_written += len(data)
-                        except BrokenPipeError:
-                            break
-                    
-                    proc.stdin.close()
-                    proc.wait()
-                    
-                    if proc.returncode == 0:
-                        generated_files.append(out_path)
-                    else:
-                        print(f"FFmpeg Error for Track {track_num}")
-                        
-                except Exception as e:
-                    print(f"Pipe Error: {e}")
-                    proc.kill()
-                    
+            with NRGReader(nrg_path) as reader, ThreadPoolExecutor(max_workers=jobs) as pool:
+                futures = []
+                for track, metadata in zip(tracks, track_tags):
+                    out_path = os.path.join(output_dir, f"{base_name} - Track {track.number:02d}.flac")
+                    futures.append(pool.submit(extract, track, out_path, metadata))
+                # Collect in submission order so output order matches track order
+                results = [future.result() for future in futures]
         except Exception as e:
             print(f"Extraction Error: {e}")
-        finally:
-            nrg_file_obj.close()
+            return []
+        
+        if self.replaygain:
+            # Gain needs the encoded audio: one extra tag pass
+            self.tag_files({out_path: metadata for out_path, metadata in zip(results, track_tags) if out_path})
+        return [out_path for out_path in results if out_path]
+
+    def nrg_track_metadata(self, index, tracks):
+        """ Tags for each NRG track from CD-TEXT, ISRC and track numbering """
+        album = index.cdtext.get(0, {})
+        tags = []
+        for track in tracks:
+            cdtext = index.cdtext.get(track.number, {})
+            tags.append({
+                'title': cdtext.get('title', ''),
+                'artist': cdtext.get('performer') or album.get('performer', ''),
+                'album': album.get('title', ''),
+                'albumartist': album.get('performer', ''),
+                'tracknumber': str(track.number),
+                'tracktotal': str(len(tracks)),
+                'isrc': track.isrc
+            })
+        return tags
+
+    def _extract_nrg_track(self, reader, track, out_path, metadata=None, cover=None):
+        """
+        Worker: encodes one NRG track from a zero-copy memoryview of its byte
+        range (mmap reads share no file position). Returns out_path on success, else None.
+        """
+        pcm = reader.track_pcm(track)
+        
+        print(f"Extracting T{track.number}: Offset {track.start_offset}, Len {len(pcm)} bytes ({track.sector_size}-byte sectors) -> {os.path.basename(out_path)}")
+        
+        if self.encode_cdda(pcm, out_path, metadata, cover):
+            return out_path
+        print(f"Encode Error for Track {track.number}")
+        return None
+
+    # --- RAW CDDA ENCODING ---
+    def encode_cdda(self, pcm, out_path, metadata=None, cover=None):
+        """
+        Encodes raw CDDA (s16le, 44100 Hz, stereo) to FLAC.
+        pcm is any bytes-like buffer, typically a zero-copy NRGReader slice.
+        metadata (tag dict, see TAG_FIELDS) and cover (image path) are written
+        by the encoder, so out_path only ever appears complete and tagged.
+        Uses the in-process backend when available (no process launch, no pipe copy),
+        otherwise pipes the buffer into ffmpeg. Returns True on success.
+        """
+        if self.flac_backend == "soundfile":
+            try:
+                self._encode_cdda_soundfile(pcm, out_path, metadata, cover)
+                return True
+            except Exception as e:
+                print(f"In-process FLAC encoder failed ({e}). Retrying with ffmpeg...")
+        return self._encode_cdda_ffmpeg(pcm, out_path, metadata, cover)
+
+    def _encode_cdda_soundfile(self, pcm, out_path, metadata=None, cover=None):
+        # libsndfile takes native-endian int16; only selected on little-endian hosts
+        view = memoryview(pcm)
+        # Only whole stereo frames (4 bytes) can be written
+        view = view[:len(view) - (len(view) % 4)]
+        # Encode + tag a .part file, then rename it: memory stays at one chunk
+        # however long the track, and out_path is never left half written
+        part_path = out_path + ".part"
+        try:
+            with soundfile.SoundFile(part_path, 'w', samplerate=44100, channels=2,
+                                     subtype='PCM_16', format='FLAC') as out:
+                for chunk in iter_chunks(view):
+                    out.buffer_write(chunk, dtype='int16')
+            if metadata or cover:
+                audio = mutagen.flac.FLAC(part_path)
+                if audio.tags is None:
+                    audio.add_tags()
+                for key, value in self.tag_values(metadata or {}).items():
+                    audio[key] = value
+                if cover:
+                    audio.add_picture(self._cover_picture(cover))
+                audio.save(padding=self._flac_padding)
+            os.replace(part_path, out_path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def _encode_cdda_ffmpeg(self, pcm, out_path, metadata=None, cover=None):
+        # FFMPEG Command: Read from Pipe, Format s16le, 44100, stereo
+        cmd = [
+            self.FFMPEG_PATH, "-y",
+            "-f", "s16le", "-ar", "44100", "-ac", "2",
+            "-i", "pipe:0"
+        ]
+        if cover:
+            cmd += ["-i", cover, "-map", "0:a:0"]
+        cmd += self.encoder_tag_args(metadata or {}, 1 if cover else None)
+        cmd += [
+            "-compression_level", "5",
+            out_path
+        ]
+        
+        proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        
+        # Feed data
+        try:
+            for chunk in iter_chunks(pcm):
+                try:
+                    proc.stdin.write(chunk)
+                except BrokenPipeError:
+                    break
             
-        return generated_files
+            proc.stdin.close()
+            proc.wait()
+            
+            if proc.returncode == 0:
+                return True
+            print(f"FFmpeg Error for {os.path.basename(out_path)}")
+                
+        except Exception as e:
+            print(f"Pipe Error: {e}")
+            proc.kill()
+            
+        return False
 
     # --- CUE / BIN SUPPORT ---
     def parse_cue(self, cue_path):
         """
-        Parses .cue file to find the BIN file, Track Timestamps, and Metadata.
+        Parses .cue file to find the BIN file, Track Timestamps, and Metadata (see cuesheet.py).
         Returns: (bin_filename, tracks_list, metadata)
                  tracks_list = [(start_sec, end_sec, track_num, track_title, track_performer)]
                  metadata = {'album': str, 'album_artist': str, 'date': str, ...}
+        Multi-FILE sheets: bin_filename is the first FILE and times are relative to
+        each track's own FILE; use CueSheet.load for the file of every track.
         """
-        tracks = []
-        bin_file = None
-        current_track_idx = 0
-        current_track_title = ""
-        current_track_performer = ""
-        
-        # Album-level metadata
-        album_title = ""
-        album_artist = ""
-        album_date = ""
-        album_genre = ""
-        in_track = False
-        
         try:
-            with open(cue_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-                
-            for line in lines:
-                stripped = line.strip()
-                parts = stripped.split()
-                if not parts: continue
-                
-                # FILE "Name.bin" BINARY
-                if parts[0] == 'FILE':
-                    match = re.search(r'FILE "(.+)"', line)
-                    if match:
-                        bin_file = match.group(1)
-                    else:
-                        bin_file = " ".join(parts[1:-1]).strip('"')
-                
-                # REM DATE or REM GENRE
-                elif parts[0] == 'REM' and len(parts) >= 3:
-                    if parts[1] == 'DATE':
-                        album_date = " ".join(parts[2:])
-                    elif parts[1] == 'GENRE':
-                        album_genre = " ".join(parts[2:])
-                
-                # PERFORMER "Artist Name"
-                elif parts[0] == 'PERFORMER':
-                    match = re.search(r'PERFORMER "(.+)"', line)
-                    if match:
-                        performer = match.group(1)
-                        if not in_track:
-                            album_artist = performer
-                        else:
-                            current_track_performer = performer
-                
-                # TITLE "Album/Track Title"
-                elif parts[0] == 'TITLE':
-                    match = re.search(r'TITLE "(.+)"', line)
-                    if match:
-                        title = match.group(1)
-                        if not in_track:
-                            album_title = title
-                        else:
-                            current_track_title = title
-                        
-                # TRACK 01 AUDIO
-                elif parts[0] == 'TRACK':
-                    in_track = True
-                    current_track_idx = int(parts[1])
-                    current_track_title = ""
-                    current_track_performer = ""
-                    
-                # INDEX 01 00:00:00
-                elif parts[0] == 'INDEX' and parts[1] == '01':
-                    timestamp = parts[2]  # MM:SS:FF
-                    try:
-                        m, s, f_res = map(int, timestamp.split(':'))
-                        seconds = m*60 + s + f_res/75.0
-                        
-                        if current_track_idx > 1 and tracks:
-                            # Close previous track
-                            prev_data = tracks[-1]
-                            tracks[-1] = (prev_data[0], seconds, prev_data[2], prev_data[3], prev_data[4])
-                            
-                        # Start new track with metadata
-                        tracks.append((seconds, None, current_track_idx, 
-                                     current_track_title, current_track_performer))
-                    except ValueError:
-                        pass
-            
-            metadata = {
-                'album': album_title,
-                'album_artist': album_artist or "Various Artists",
-                'date': album_date,
-                'genre': album_genre
-            }
-            
-        except Exception as e:
+            sheet = CueSheet.load(cue_path)
+        except (OSError, CueError) as e:
             print(f"CUE Parse Error: {e}")
             return None, [], {}
-            
-        return bin_file, tracks, metadata
+        tracks = [(t.start_seconds, t.end_seconds, t.number, t.title, t.performer) for t in sheet.tracks]
+        return (sheet.files[0][0] if sheet.files else None), tracks, sheet.metadata()
 
-    def extract_cue_direct(self, cue_path, output_dir):
+    def locate_cue_source(self, cue_path, bin_filename, single_file=True):
+        """
+        Path of the CUE's audio source (BIN/WAV/FLAC/APE), or None.
+        Also finds the file re-encoded under another extension; single_file=False
+        (multi-FILE sheets) skips the guess from the CUE's own name.
+        """
+        cue_dir = os.path.dirname(cue_path)
+        source_path = os.path.join(cue_dir, bin_filename)
+        if os.path.exists(source_path):
+            return source_path
+        
+        # If not found, try other extensions of the FILE name, then of the CUE
+        bases = [os.path.splitext(source_path)[0]]
+        if single_file:
+            bases.append(os.path.splitext(cue_path)[0])
+        for base in bases:
+            for ext in ['.bin', '.wav', '.flac', '.ape', '.wv']:
+                alt_path = base + ext
+                if os.path.exists(alt_path):
+                    return alt_path
+        return None
+
+    def extract_cue_direct(self, cue_path, output_dir, single_pass=True):
+        """
+        Extracts every CUE track to FLAC and tags it with the CUE metadata.
+        single_pass=True decodes the source once for all tracks (O(disc length));
+        CD audio sources journal every track as it is encoded, so a killed run
+        resumes after its last finished track.
+        single_pass=False launches one ffmpeg per track (legacy mode).
+        Multi-FILE sheets are extracted source by source.
+        Returns list of generated files.
+        """
         print(f"Processing CUE Sheet: {cue_path}")
-        bin_filename, tracks, metadata = self.parse_cue(cue_path)
+        try:
+            sheet = CueSheet.load(cue_path)
+        except (OSError, CueError) as e:
+            print(f"CUE Parse Error: {e}")
+            return []
         
-        if not bin_filename or not tracks:
+        # Data tracks (Enhanced CD rips) are not audio
+        tracks = [track for track in sheet.tracks if track.type == 'AUDIO']
+        if not tracks:
             print("Invalid CUE or no tracks found.")
             return []
-            
-        # Locate source file (BIN/WAV/FLAC/APE)
-        cue_dir = os.path.dirname(cue_path)
-        source_path = os.path.join(cue_dir, bin_filename)
+        metadata = sheet.metadata()
         
-        # If not found, try replacing extension of CUE
-        if not os.path.exists(source_path):
-             base = os.path.splitext(cue_path)[0]
-             # Try common extensions
-             for ext in ['.bin', '.wav', '.flac', '.ape', '.wv']:
-                 alt_path = base + ext
-                 if os.path.exists(alt_path):
-                     source_path = alt_path
-                     break
-             else:
-                 print(f"Source file not found: {bin_filename}")
-                 return []
-        
-        print(f"Using source: {source_path}")
-        
-        # Detect if it's raw BIN or container format
-        lower_ext = os.path.splitext(source_path)[1].lower()
-        is_raw_bin = lower_ext == '.bin'
+        sources = {}
+        for file_index in sorted({track.file_index for track in tracks}):
+            bin_filename = sheet.files[file_index][0]
+            source_path = self.locate_cue_source(cue_path, bin_filename, len(sheet.files) == 1)
+            if not source_path:
+                print(f"Source file not found: {bin_filename}")
+                return []
+            sources[file_index] = source_path
             
-        generated_files = []
+        # Build the per-track job list (output path + tags) once for both extraction modes
+        jobs = []
         
-        for i, track_data in enumerate(tracks):
-            start, end, track_num, track_title, track_performer = track_data
+        for track in tracks:
+            track_num, track_title, track_performer = track.number, track.title, track.performer
             
             # Use track title if available, otherwise default
             if track_title:
@@ -765,75 +1328,388 @@ class AudioProcessor:
             
             output_path = os.path.join(output_dir, f"{track_name}.flac")
             
-            # Formulate FFmpeg command
-            if is_raw_bin:
-                # Raw CDDA format
-                cmd = [
-                    self.FFMPEG_PATH, "-y",
-                    "-f", "s16le", "-ar", "44100", "-ac", "2",
-                    "-i", source_path,
-                    "-ss", f"{start:.3f}"
-                ]
+            tag_metadata = {
+                'title': track_title or f"Track {track_num}",
+                'artist': track_performer or metadata.get('album_artist', ''),
+                'album': metadata.get('album', ''),
+                'albumartist': metadata.get('album_artist', ''),
+                'tracknumber': str(track_num),
+                'tracktotal': str(len(tracks)),
+                'date': metadata.get('date', ''),
+                'genre': metadata.get('genre', ''),
+                'isrc': track.isrc
+            }
+            jobs.append((track.start_seconds, track.end_seconds, track_num, track_name, output_path, tag_metadata))
+        
+        # Tags + cover are written by the encoder: one write per output file
+        cover = self.find_cover_art(os.path.dirname(cue_path))
+        finished = set()
+        for file_index, source_path in sources.items():
+            print(f"Using source: {source_path}")
+            source_jobs = [job for job, track in zip(jobs, tracks) if track.file_index == file_index]
+            finished.update(self._extract_cue_source(source_path, source_jobs, cover, single_pass))
+        
+        # Keep CUE order, finished tracks included
+        extracted = [job for job in jobs if job[4] in finished]
+        
+        if self.replaygain:
+            # Gain needs the encoded audio: one extra tag pass
+            self.tag_files({output_path: tag_metadata for _, _, _, _, output_path, tag_metadata in extracted})
+        generated_files = [output_path for _, _, _, _, output_path, _ in extracted]
+        print(f"Extracted & Tagged {len(generated_files)} tracks")
+                
+        return generated_files
+
+    def _extract_cue_source(self, source_path, jobs, cover, single_pass):
+        """ Extracts the jobs of one CUE source file; returns the output paths that are done """
+        # Detect if it's raw BIN or container format
+        is_raw_bin = os.path.splitext(source_path)[1].lower() == '.bin'
+        
+        # Tracks the journal already has (resume): not re-encoded
+        finished = set()
+        if self.resume:
+            finished = {job[4] for job in jobs if self.journal.track_done(job[4], source_path, self._cue_job_range(job))}
+            if finished:
+                print(f"{len(finished)} of {len(jobs)} tracks already extracted, skipping them.")
+        pending = [job for job in jobs if job[4] not in finished]
+        
+        extracted = []
+        if pending and is_raw_bin and self.flac_backend != "ffmpeg":
+            # Raw CDDA: cut by byte range and encode in-process
+            extracted = self._extract_cue_raw_bin(source_path, pending, cover)
+            pending = []
+        elif pending and single_pass and (is_raw_bin or self.is_cdda_source(source_path)):
+            # CD audio: one decode, every track journaled as soon as it is encoded
+            extracted = self._extract_cue_decoded(source_path, is_raw_bin, pending, cover)
+            done = {job[4] for job in extracted}
+            pending = [job for job in pending if job[4] not in done]
+            if pending:
+                print(f"Decoded extraction stopped early. Falling back to per-track extraction for {len(pending)} tracks...")
+        elif pending and single_pass and self.ffmpeg_has_filter("asegment"):
+            single = self._extract_cue_single_pass(source_path, is_raw_bin, pending, cover)
+            if single is None:
+                print("Single-pass extraction failed. Falling back to per-track extraction...")
             else:
-                # Auto-detect format (WAV/FLAC/APE)
-                cmd = [
-                    self.FFMPEG_PATH, "-y",
-                    "-i", source_path,
-                    "-ss", f"{start:.3f}"
-                ]
+                extracted, pending = single, []
+        if pending:
+            extracted += self._extract_cue_per_track(source_path, is_raw_bin, pending, cover)
+        return finished | {job[4] for job in extracted}
+
+    def is_cdda_source(self, source_path):
+        """ True if a CUE source holds CD audio (44.1 kHz, 16 bit, stereo): decoding it to raw CDDA is lossless """
+        info = read_flac_streaminfo(source_path)
+        if info:
+            return (info['sample_rate'], info['channels'], info['bits_per_sample']) == (44100, 2, 16)
+        res = subprocess.run([self.FFMPEG_PATH, "-hide_banner", "-i", source_path], stderr=subprocess.PIPE,
+                             text=True, encoding='utf-8', errors='replace')
+        # Stream #0:0: Audio: pcm_s16le (...), 44100 Hz, stereo, s16, 1411 kb/s
+        for line in res.stderr.splitlines():
+            if "Audio:" in line:
+                fields = [field.strip() for field in line.split("Audio:", 1)[1].split(",")]
+                return ("44100 Hz" in fields and ("stereo" in fields or "2 channels" in fields)
+                        and any(field.split()[:1] in (["s16"], ["s16p"]) for field in fields))
+        return False
+
+    @staticmethod
+    def _cue_job_range(job):
+        """ Journal key for the source range of a CUE job """
+        start, end = job[0], job[1]
+        return f"{start:.6f}-{'' if end is None else f'{end:.6f}'}"
+
+    def _record_cue_job(self, job, source_path, expected_md5=None):
+        self.journal.record_track(job[4], source_path, self._cue_job_range(job), expected_md5)
+
+    def _source_input_args(self, source_path, is_raw_bin):
+        """ FFmpeg input arguments for a CUE source (raw CDDA needs explicit format) """
+        if is_raw_bin:
+            # Raw CDDA format
+            return ["-f", "s16le", "-ar", "44100", "-ac", "2", "-i", source_path]
+        # Auto-detect format (WAV/FLAC/APE)
+        return ["-i", source_path]
+
+    def _log_ffmpeg_error(self, error_msg):
+        print(error_msg)
+        # Also save to file
+        with open("ffmpeg_error.log", "a", encoding="utf-8") as f:
+            f.write(error_msg + "\n" + "="*80 + "\n")
+
+    def segment_pieces(self, segments):
+        """
+        Maps segments onto the pieces produced by cutting the stream at every
+        segment boundary. segments = [(start_sec, end_sec or None)], sorted and non-overlapping.
+        Returns: (points, pieces) - points = sorted cut times, piece k covers
+                 [points[k-1] or 0, points[k] or end of stream); pieces[i] = piece of segments[i].
+        """
+        points = sorted({t for seg in segments for t in seg if t is not None and t > 0})
+        bounds = [0.0] + points
+        piece_of = {t: k for k, t in enumerate(bounds)}
+        
+        pieces = []
+        for start, end in segments:
+            k = piece_of[start] if start > 0 else 0
+            next_bound = bounds[k + 1] if k + 1 < len(bounds) else None
+            if end is not None and next_bound != end:
+                raise ValueError(f"Overlapping segment: {start} -> {end}")
+            pieces.append(k)
+        return points, pieces
+
+    def build_segment_graph(self, segments):
+        """
+        Builds an asegment filter graph that cuts the decoded audio stream at every
+        segment boundary in a single pass (sample accurate).
+        segments = [(start_sec, end_sec or None)], sorted and non-overlapping.
+        Returns: (filter_complex, labels) where labels[i] is the output pad of segments[i].
+                 Pieces between segments (gaps, HTOA) are routed to anullsink.
+        """
+        points, pieces = self.segment_pieces(segments)
+        labels = [f"s{k}" for k in pieces]
+        
+        pads = "".join(f"[s{k}]" for k in range(len(points) + 1))
+        if points:
+            timestamps = "|".join(f"{t:.6f}" for t in points)
+            graph = f"[0:a:0]asegment=timestamps={timestamps}{pads}"
+        else:
+            graph = f"[0:a:0]anull{pads}"
+        
+        # Discard pieces that don't belong to any segment
+        used = set(pieces)
+        for k in range(len(points) + 1):
+            if k not in used:
+                graph += f";[s{k}]anullsink"
+                
+        return graph, labels
+
+    def _extract_cue_single_pass(self, source_path, is_raw_bin, jobs, cover=None):
+        """
+        Decodes the source ONCE and cuts it at the CUE INDEX 01 boundaries with an
+        asegment filter graph, feeding every segment to its own FLAC encoder.
+        Returns the list of extracted jobs, or None if the single-pass run failed.
+        """
+        try:
+            graph, labels = self.build_segment_graph([(job[0], job[1]) for job in jobs])
+        except (KeyError, ValueError) as e:
+            print(f"Cannot build single-pass graph: {e}")
+            return None
+        
+        cmd = [self.FFMPEG_PATH, "-y"] + self._source_input_args(source_path, is_raw_bin)
+        if cover:
+            cmd.extend(["-i", cover])
+        cmd.extend(["-filter_complex", graph])
+        for label, job in zip(labels, jobs):
+            cmd.extend(["-map", f"[{label}]"] + self.encoder_tag_args(job[5], 1 if cover else None))
+            cmd.extend(["-compression_level", "5", job[4]])
+        
+        print(f"Single-pass extraction of {len(jobs)} tracks...")
+        try:
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        except subprocess.CalledProcessError as e:
+            error_msg = "Single-pass extraction failed:\n"
+            error_msg += f"  Command: {' '.join(cmd)}\n"
+            error_msg += f"  Stderr: {e.stderr}\n"
+            self._log_ffmpeg_error(error_msg)
+            return None
+        
+        extracted = [job for job in jobs if os.path.exists(job[4])]
+        for job in extracted:
+            self._record_cue_job(job, source_path)
+        return extracted
+
+    def _extract_cue_decoded(self, source_path, is_raw_bin, jobs, cover=None):
+        """
+        Decodes a CD audio source ONCE to raw CDDA on a pipe and reads it track by
+        track (CUE times are whole sectors); each track's PCM is encoded on the
+        worker pool and journaled, with its PCM MD5, as soon as its FLAC is written.
+        An interrupted run therefore resumes after its last finished track (an
+        asegment graph only finalizes its FLACs when the whole run exits).
+        At most max_workers tracks are held in memory. Returns the list of
+        extracted jobs; tracks after a decode error are missing from it.
+        """
+        def encode(job, pcm):
+            if not self.encode_cdda(pcm, job[4], job[5], cover):
+                return False
+            self._record_cue_job(job, source_path, pcm_md5(pcm))
+            return True
+        
+        cmd = [self.FFMPEG_PATH, "-v", "error"] + self._source_input_args(source_path, is_raw_bin)
+        cmd += ["-map", "0:a:0", "-f", "s16le", "-ac", "2", "-ar", "44100", "pipe:1"]
+        print(f"Decoded extraction of {len(jobs)} tracks...")
+        try:
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"Cannot start decoder: {e}")
+            return []
+        
+        workers = max(1, self.max_workers)
+        futures = {}
+        position = 0  # sectors read from the pipe
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                for job in jobs:
+                    start_sector = int(round(job[0] * 75))
+                    end_sector = int(round(job[1] * 75)) if job[1] is not None else None
+                    if start_sector < position:
+                        print(f"Track {job[2]} overlaps the previous one, leaving it to per-track extraction.")
+                        break
+                    # Skip the tracks already done (and data between tracks)
+                    skip = (start_sector - position) * CDDA_SECTOR_SIZE
+                    while skip > 0:
+                        chunk = proc.stdout.read(min(skip, NRGReader.CHUNK_SIZE))
+                        if not chunk:
+                            break
+                        skip -= len(chunk)
+                    if skip > 0:
+                        break
+                    if end_sector is None:
+                        # Last track: up to the end of the source, complete only if decoding was
+                        pcm = proc.stdout.read()
+                        if proc.wait() != 0:
+                            print(f"Decoding failed with exit code {proc.returncode} in track {job[2]}.")
+                            break
+                    else:
+                        pcm = proc.stdout.read((end_sector - start_sector) * CDDA_SECTOR_SIZE)
+                        if len(pcm) < (end_sector - start_sector) * CDDA_SECTOR_SIZE:
+                            print(f"Decoding stopped in track {job[2]}.")
+                            break
+                        position = end_sector
+                    running = [f for f in futures.values() if not f.done()]
+                    if len(running) >= workers:
+                        wait(running, return_when=FIRST_COMPLETED)
+                    futures[job[4]] = pool.submit(encode, job, pcm)
+                    del pcm
+        finally:
+            if proc.poll() is None:
+                # Tracks after the last pending one are not needed
+                proc.kill()
+            proc.stdout.close()
+            proc.wait()
+        return [job for job in jobs if job[4] in futures and futures[job[4]].result()]
+
+    def _extract_cue_raw_bin(self, source_path, jobs, cover=None):
+        """
+        Encodes the tracks of a raw CDDA .bin straight from their byte ranges
+        (CUE times are whole sectors) on the worker pool.
+        """
+        with NRGReader(source_path) as reader:
+            def encode(job):
+                start, end, track_num, track_name, output_path, tag_metadata = job
+                start_sector = int(round(start * 75))
+                end_sector = int(round(end * 75)) if end is not None else reader.size // CDDA_SECTOR_SIZE
+                pcm = reader.sectors(start_sector, end_sector)
+                if not self.encode_cdda(pcm, output_path, tag_metadata, cover):
+                    return False
+                self._record_cue_job(job, source_path, pcm_md5(pcm))
+                return True
+            
+            with ThreadPoolExecutor(max_workers=max(1, self.max_workers)) as pool:
+                results = list(pool.map(encode, jobs))
+        return [job for job, ok in zip(jobs, results) if ok]
+
+    def _extract_cue_per_track(self, source_path, is_raw_bin, jobs, cover=None):
+        """ Legacy mode: one ffmpeg launch per track (re-decodes from the start of the source) """
+        extracted = []
+        
+        for job in jobs:
+            start, end, track_num, track_name, output_path, tag_metadata = job
+            
+            # Formulate FFmpeg command
+            cmd = [self.FFMPEG_PATH, "-y"]
+            trim = ["-ss", f"{start:.3f}"]
             
             if end is not None:
-                cmd.extend(["-to", f"{end:.3f}"])
-                
+                trim.extend(["-to", f"{end:.3f}"])
+            
+            if cover:
+                # Output-side -ss would also drop the cover frame (pts 0): seek the source input instead
+                cmd.extend(trim + self._source_input_args(source_path, is_raw_bin))
+                cmd.extend(["-i", cover, "-map", "0:a:0"])
+            else:
+                cmd.extend(self._source_input_args(source_path, is_raw_bin) + trim)
+            
+            cmd.extend(self.encoder_tag_args(tag_metadata, 1 if cover else None))
             cmd.extend([output_path])
             
             try:
                 result = subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                
-                # Tag the file
-                tag_metadata = {
-                    'title': track_title or f"Track {track_num}",
-                    'artist': track_performer or metadata.get('album_artist', ''),
-                    'album': metadata.get('album', ''),
-                    'albumartist': metadata.get('album_artist', ''),
-                    'tracknumber': str(track_num),
-                    'date': metadata.get('date', ''),
-                    'genre': metadata.get('genre', '')
-                }
-                self.tag_file(output_path, tag_metadata)
-                
-                generated_files.append(output_path)
-                print(f"Extracted & Tagged: {track_name}")
+                self._record_cue_job(job, source_path)
+                extracted.append(job)
             except subprocess.CalledProcessError as e:
                 error_msg = f"Failed to extract Track {track_num}:\n"
                 error_msg += f"  Command: {' '.join(cmd)}\n"
                 error_msg += f"  Stderr: {e.stderr}\n"
-                print(error_msg)
-                # Also save to file
-                with open("ffmpeg_error.log", "a", encoding="utf-8") as f:
-                    f.write(error_msg + "\n" + "="*80 + "\n")
+                self._log_ffmpeg_error(error_msg)
                 
-        return generated_files
+        return extracted
+
+    @staticmethod
+    def split_job_settings(db_threshold, min_duration):
+        """ Journal settings of a silence split: new parameters split the file again """
+        return f"silence:{db_threshold:g}/{min_duration:g}"
 
-    def process_iso_workflow(self, file_path, output_dir):
+    def image_job_settings(self, file_path, identify=False):
+        """
+        Journal settings of a disc image job: the SACD PCM format (ISO/NRG) and
+        identify. A finished image is only skipped while they match.
+        """
+        parts = []
+        if file_path.lower().endswith(('.iso', '.nrg')) and (self.sacd_pcm_rate or self.sacd_bit_depth):
+            parts.append(f"sacd:{self.sacd_pcm_rate or ''}/{self.sacd_bit_depth or ''}")
+        if identify:
+            parts.append("identify")
+        return " ".join(parts)
+
+    def process_iso_workflow(self, file_path, output_dir, identify=False):
         """
         Simplified Workflow for ISO/NRG/CUE (No Mounting).
+        identify=True tags NRG/CUE tracks from MusicBrainz (DiscID first,
+        fingerprints as fallback).
+        Jobs are journaled: a finished image is skipped (self.resume) unless the
+        SACD format or identify changed, and an interrupted one resumes after its
+        last finished track.
         Returns list of generated files.
         """
         print(f"DEBUG: Entered process_iso_workflow with {file_path}")
+        journal = self.journal
+        settings = self.image_job_settings(file_path, identify)
+        if self.resume:
+            finished = journal.finished_outputs(file_path, settings)
+            if finished:
+                print(f"Already processed ({len(finished)} files), skipping: {file_path}")
+                return finished
+        
+        journal.start_job(file_path, settings)
+        try:
+            res = self._process_image(file_path, output_dir, identify)
+        except Exception:
+            journal.fail_job(file_path, settings)
+            raise
+        if res:
+            journal.finish_job(file_path, res, settings)
+        else:
+            journal.fail_job(file_path, settings)
+        return res
+
+    def _process_image(self, file_path, output_dir, identify):
         lower_path = file_path.lower()
         
         # 1. CUE SHEET Support
         if lower_path.endswith('.cue'):
              print("Detected CUE Sheet. Direct extraction...")
-             return self.extract_cue_direct(file_path, output_dir)
+             res = self.extract_cue_direct(file_path, output_dir)
+             if res and identify:
+                 self.tag_identified(self.identify_disc(self.disc_toc(file_path), res))
+             return res
     
         # 2. NRG Direct Extraction
         if lower_path.endswith('.nrg'):
             print("Detected NRG. Direct parsing...")
             res = self.extract_nrg_direct(file_path, output_dir)
             if res:
+                if identify:
+                    self.tag_identified(self.identify_disc(self.disc_toc(file_path), res))
                 return res
+            if is_sacd_image(file_path):
+                print("NRG holds an SACD image. Attempting SACD extraction...")
+                return self.process_iso(file_path, output_dir)[0] or []
             print("NRG direct parsing failed.")
             return []
         
@@ -877,57 +1753,335 @@ class AudioProcessor:
             return []
 
     def extract_sacd_legacy(self, iso_path, output_dir):
-        # ... logic moved from old process_iso ...
-        sacd_exe = self.get_resource_path("sacd_extract.exe")
-        cmd_extract = [sacd_exe, "-2", "-s", "-c", "-i", iso_path]
-        try:
-            subprocess.run(cmd_extract, cwd=output_dir, check=True, stdout=subprocess.DEVNULL)
-            # Find DSF and convert to FLAC (existing logic)
-            dsf_files = sorted([os.path.join(output_dir, f) for f in os.listdir(output_dir) if f.casefold().endswith('.dsf')])
-            flac_files = []
-            for dsf in dsf_files:
-                flac_name = os.path.splitext(os.path.basename(dsf))[0] + ".flac"
-                flac_path = os.path.join(output_dir, flac_name)
-                # Ensure FFMPEG_PATH is available
-                subprocess.run([self.FFMPEG_PATH, "-y", "-i", dsf, "-compression_level", "5", flac_path], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                flac_files.append(flac_path)
+        flac_files, extracted = self.extract_sacd(iso_path, output_dir)
+        # An interrupted disc must fail the job, so resume extracts it again
+        return flac_files if extracted else []
+
+    def sacd_flac_args(self):
+        """
+        FFmpeg output options for DSF -> FLAC (sacd_pcm_rate / sacd_bit_depth, None = ffmpeg default).
+        Raises ValueError for a rate or depth outside SACD_PCM_RATES / SACD_BIT_DEPTHS.
+        """
+        if self.sacd_pcm_rate not in (None,) + self.SACD_PCM_RATES:
+            raise ValueError(f"Unsupported SACD PCM rate {self.sacd_pcm_rate} (use one of {self.SACD_PCM_RATES})")
+        if self.sacd_bit_depth not in (None,) + self.SACD_BIT_DEPTHS:
+            raise ValueError(f"Unsupported SACD bit depth {self.sacd_bit_depth} (use one of {self.SACD_BIT_DEPTHS})")
+        args = []
+        if self.sacd_pcm_rate:
+            args += ["-ar", str(self.sacd_pcm_rate)]
+        if self.sacd_bit_depth == 16:
+            args += ["-sample_fmt", "s16"]
+        elif self.sacd_bit_depth == 24:
+            args += ["-sample_fmt", "s32", "-bits_per_raw_sample", "24"]
+        return args + ["-compression_level", "5"]
+
+    def extract_sacd(self, iso_path, output_dir, source_path=None, jobs=None):
+        """
+        Pipelined SACD extraction through a private scratch folder (in scratch_dir,
+        default: the system temp dir): sacd_extract writes DSF tracks there while
+        up to jobs (default self.max_workers) ffmpeg workers convert every finished
+        DSF to FLAC and delete it. Each FLAC is encoded next to its final name and
+        renamed into output_dir when complete, so the library folder never sees
+        DSFs or partial files.
+        With sacd_scratch_limit set, tracks are extracted one at a time (-t n) and
+        the next one only starts while the DSFs waiting for conversion stay below
+        the limit; sacd_extract builds without track selection fall back to
+        whole-disc extraction.
+        Finished FLACs are journaled against source_path (default iso_path).
+        Returns (flac_files in track order, True if sacd_extract succeeded).
+        """
+        source_path = source_path or iso_path
+        jobs = max(1, jobs or self.max_workers)
+        flac_args = self.sacd_flac_args()
+        # Settings are part of the journal range: changing them re-converts
+        settings = "" if len(flac_args) == 2 else f"@{self.sacd_pcm_rate or ''}/{self.sacd_bit_depth or ''}"
+
+        def convert(dsf):
+            flac_name = os.path.splitext(os.path.basename(dsf))[0] + ".flac"
+            flac_path = os.path.join(output_dir, flac_name)
+            source_range = f"dsf:{os.path.basename(dsf)}{settings}"
+            part_path = flac_path + ".part"
+            try:
+                if self.resume and self.journal.track_done(flac_path, source_path, source_range):
+                    print(f"Up to date, skipping conversion: {flac_name}")
+                else:
+                    print(f"Converting to FLAC: {flac_name}")
+                    subprocess.run([self.FFMPEG_PATH, "-y", "-i", dsf] + flac_args + ["-f", "flac", part_path],
+                                   check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    os.replace(part_path, flac_path)
+                    self.journal.record_track(flac_path, source_path, source_range)
+                return flac_path
+            except (subprocess.CalledProcessError, OSError) as e:
+                print(f"Failed to convert {dsf}: {e}")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+                return None
+            finally:
                 os.remove(dsf)
-            return flac_files
-        except Exception as e:
-            print(f"SACD Extract Error: {e}")
-            return []
+
+        scratch = tempfile.mkdtemp(prefix="sacd_", dir=self.scratch_dir)
+        futures = {}
+        try:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                def submit(dsf):
+                    if dsf not in futures:
+                        futures[dsf] = pool.submit(convert, dsf)
+
+                extracted = None
+                if self.sacd_scratch_limit:
+                    extracted = self._sacd_extract_tracks(iso_path, scratch, submit, futures)
+                if extracted is None:
+                    extracted = self._sacd_extract_disc(iso_path, scratch, submit)
+                flac_files = [futures[dsf].result() for dsf in sorted(futures)]
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
+        return [path for path in flac_files if path], extracted
+
+    @staticmethod
+    def _scratch_dsfs(scratch):
+        """ {dsf path: size} below the scratch folder (sacd_extract may add an album folder) """
+        found = {}
+        for root, _, names in os.walk(scratch):
+            for name in names:
+                if name.casefold().endswith('.dsf'):
+                    path = os.path.join(root, name)
+                    try:
+                        found[path] = os.path.getsize(path)
+                    except OSError:
+                        pass
+        return found
+
+    def _sacd_command(self, iso_path, track=None):
+        # sacd_extract -2 (stereo) -s (DSF) -c (convert DST) [-t n] -i input.iso; writes to its CWD
+        cmd = [self.get_resource_path("sacd_extract.exe"), "-2", "-s", "-c"]
+        if track is not None:
+            cmd += ["-t", str(track)]
+        return cmd + ["-i", iso_path]
+
+    def _sacd_extract_disc(self, iso_path, scratch, submit):
+        """ Whole stereo area in one run; a DSF is handed off once the next track's file appears """
+        try:
+            proc = subprocess.Popen(self._sacd_command(iso_path), cwd=scratch, stdout=subprocess.DEVNULL)
+        except OSError as e:
+            print(f"sacd_extract failed: {e}")
+            return False
+        try:
+            while True:
+                try:
+                    proc.wait(timeout=self.SACD_POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    # Tracks are written in order: the newest one may still be growing
+                    for dsf in sorted(self._scratch_dsfs(scratch))[:-1]:
+                        submit(dsf)
+        finally:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
+        dsfs = sorted(self._scratch_dsfs(scratch))
+        if proc.returncode != 0:
+            print(f"sacd_extract failed with exit code {proc.returncode}")
+            if dsfs:
+                # The track being written when it stopped is truncated
+                os.remove(dsfs.pop())
+        for dsf in dsfs:
+            submit(dsf)
+        return proc.returncode == 0
+
+    def _sacd_track_count(self, iso_path):
+        """ Stereo area track count from 'sacd_extract -P' (first 'Track count: N' line), or None """
+        try:
+            result = subprocess.run([self.get_resource_path("sacd_extract.exe"), "-P", "-i", iso_path],
+                                    capture_output=True, timeout=60)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode != 0:
+            return None
+        for line in result.stdout.decode('utf-8', errors='replace').splitlines():
+            label, _, value = line.partition(':')
+            if label.strip().casefold() == "track count" and value.strip().isdigit():
+                return int(value.strip())
+        return None
+
+    def _sacd_extract_tracks(self, iso_path, scratch, submit, futures):
+        """
+        One sacd_extract run per track, each DSF handed off as its run exits. The
+        track count comes from the disc TOC (-P); without it, runs continue until
+        one exits cleanly with nothing (past the last track). A failed run, or a
+        known track that produces nothing, fails the disc. Before each run, waits
+        for conversions while the DSFs in scratch exceed sacd_scratch_limit (a
+        single track may still exceed it). Returns None if track selection is
+        unsupported.
+        """
+        track_count = self._sacd_track_count(iso_path)
+        track = 1
+        while track_count is None or track <= track_count:
+            while sum(self._scratch_dsfs(scratch).values()) >= self.sacd_scratch_limit:
+                running = [f for f in futures.values() if not f.done()]
+                if not running:
+                    break
+                wait(running, return_when=FIRST_COMPLETED)
+            try:
+                result = subprocess.run(self._sacd_command(iso_path, track), cwd=scratch,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            except OSError as e:
+                print(f"sacd_extract failed: {e}")
+                return False
+            new = sorted(dsf for dsf in self._scratch_dsfs(scratch) if dsf not in futures)
+            if not new and track == 1:
+                print("sacd_extract has no per-track selection, extracting the whole disc...")
+                return None
+            if result.returncode != 0:
+                print(f"sacd_extract failed on track {track} with exit code {result.returncode}")
+                for dsf in new:
+                    os.remove(dsf)
+                return False
+            if not new:
+                if track_count is None:
+                    return True
+                print(f"sacd_extract wrote nothing for track {track} of {track_count}")
+                return False
+            for dsf in new:
+                submit(dsf)
+            track += 1
+        return True
+
+    def tag_identified(self, results):
+        """ Tags every file of an identify_disc()/identify_tracks() result that matched """
+        return self.tag_files({path: metadata for path, metadata in results.items() if metadata})
+
+    def tag_values(self, metadata):
+        """ Metadata dict -> {tag name: str value} (see TAG_FIELDS); empty values are skipped """
+        return {self.TAG_FIELDS[key]: str(value) for key, value in metadata.items()
+                if key in self.TAG_FIELDS and value not in (None, '')}
+
+    def encoder_tag_args(self, metadata, cover_input=None):
+        """
+        FFmpeg output options that write the tags at encode time.
+        cover_input is the index of an image input to embed as the front cover.
+        """
+        args = []
+        for key, value in self.tag_values(metadata).items():
+            args += ["-metadata", f"{key}={value}"]
+        if cover_input is not None:
+            args += ["-map", f"{cover_input}:v:0", "-c:v", "copy",
+                     "-disposition:v:0", "attached_pic", "-metadata:s:v:0", "comment=Cover (front)"]
+        return args
+
+    def find_cover_art(self, folder):
+        """ Path of cover/folder/front .jpg/.png in folder (case-insensitive), or None """
+        try:
+            names = {name.lower(): name for name in os.listdir(folder)}
+        except OSError:
+            return None
+        for stem in self.COVER_NAMES:
+            for ext in self.COVER_EXTS:
+                if stem + ext in names:
+                    return os.path.join(folder, names[stem + ext])
+        return None
+
+    def _cover_picture(self, cover):
+        picture = mutagen.flac.Picture()
+        picture.type = 3  # Front cover
+        picture.mime = self.COVER_EXTS.get(os.path.splitext(cover)[1].lower(), 'image/jpeg')
+        with open(cover, 'rb') as f:
+            picture.data = f.read()
+        return picture
 
     def tag_file(self, file_path, metadata):
         """
-        Applies tags using Mutagen.
-        Supports FLAC, MP3, OGG, etc. automatically via mutagen.File
+        Writes the full tag set (see TAG_FIELDS) with one open and one save.
+        FLAC is opened directly and saved with TAG_PADDING reserved; other
+        formats go through mutagen.File(easy=True). Empty values are skipped.
+        Returns True if the file was tagged.
         """
+        tags = self.tag_values(metadata)
         try:
-            audio = File(file_path, easy=True)
-            
+            if file_path.lower().endswith('.flac'):
+                audio = mutagen.flac.FLAC(file_path)
+            else:
+                audio = File(file_path, easy=True)
             if audio is None:
-                # Fallback for fresh FLACs from ffmpeg sometimes needed
+                print(f"Mutagen could not handle: {file_path}")
+                return False
+            if audio.tags is None:
+                audio.add_tags()
+            
+            is_flac = isinstance(audio, mutagen.flac.FLAC)
+            if not is_flac and 'tracktotal' in tags:
+                # ID3/MP4 carry the total inside the track number ("3/12")
+                total = tags.pop('tracktotal')
+                if 'tracknumber' in tags:
+                    tags['tracknumber'] = f"{tags['tracknumber']}/{total}"
+            for key, value in tags.items():
                 try:
-                    audio = mutagen.flac.FLAC(file_path)
-                except:
-                    print(f"Mutagen could not handle: {file_path}")
-                    return
-
-            if metadata.get('title'):
-                audio['title'] = metadata['title']
-            if metadata.get('artist'):
-                audio['artist'] = metadata['artist']
-            if metadata.get('album'):
-                audio['album'] = metadata['album']
+                    audio[key] = value
+                except (KeyError, ValueError):
+                    pass  # Not representable in this format's easy tags
             
-            # Save tags
-            audio.save()
+            if is_flac:
+                audio.save(padding=self._flac_padding)
+            else:
+                audio.save()
             print(f"Tagged: {file_path}")
-            
-        except ImportError:
-            print("Mutagen not installed. Skipping tags.")
+            return True
         except Exception as e:
             print(f"Error tagging {file_path}: {e}")
+            return False
+
+    def _flac_padding(self, info):
+        # Keep the in-place padding when the new tags fit, else reserve TAG_PADDING
+        return info.padding if info.padding >= 0 else self.TAG_PADDING
+
+    def tag_files(self, tags, jobs=None, replaygain=None):
+        """
+        Tags many files on a thread pool. tags = {file_path: metadata}.
+        replaygain=True (default: self.replaygain) first measures track gain for
+        every file and album gain across all of them (the files must be one album).
+        Returns the number of files tagged.
+        """
+        replaygain = self.replaygain if replaygain is None else replaygain
+        jobs = max(1, jobs or self.max_workers)
+        tags = {path: dict(metadata) for path, metadata in tags.items()}
+        if not tags:
+            return 0
+        with ThreadPoolExecutor(max_workers=jobs) as pool:
+            if replaygain:
+                paths = list(tags)
+                album = pool.submit(self.measure_replaygain, paths)
+                for path, (gain, peak) in zip(paths, pool.map(self.measure_replaygain, [[p] for p in paths])):
+                    if gain is not None:
+                        tags[path]['replaygain_track_gain'] = f"{gain:.2f} dB"
+                        tags[path]['replaygain_track_peak'] = f"{peak:.6f}"
+                gain, peak = album.result()
+                if gain is not None:
+                    for metadata in tags.values():
+                        metadata['replaygain_album_gain'] = f"{gain:.2f} dB"
+                        metadata['replaygain_album_peak'] = f"{peak:.6f}"
+            return sum(pool.map(lambda item: self.tag_file(*item), tags.items()))
+
+    def measure_replaygain(self, file_paths):
+        """
+        ReplayGain of the given files played back to back (one file = track gain,
+        the whole disc = album gain) via ffmpeg's replaygain filter.
+        Returns (gain_db, peak) or (None, None).
+        """
+        cmd = [self.FFMPEG_PATH, "-hide_banner", "-nostats"]
+        for path in file_paths:
+            cmd += ["-i", path]
+        inputs = "".join(f"[{n}:a]" for n in range(len(file_paths)))
+        cmd += ["-filter_complex", f"{inputs}concat=n={len(file_paths)}:v=0:a=1,replaygain", "-f", "null", "-"]
+        try:
+            res = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, encoding='utf-8', errors='replace')
+        except OSError as e:
+            print(f"ReplayGain error: {e}")
+            return None, None
+        gain = re.search(r"track_gain = ([-+]?\d+(?:\.\d+)?) dB", res.stderr)
+        peak = re.search(r"track_peak = (\d+(?:\.\d+)?)", res.stderr)
+        if not gain or not peak:
+            print(f"ReplayGain measurement failed for {file_paths[0]}")
+            return None, None
+        return float(gain.group(1)), float(peak.group(1))
 
     def retag_from_cue(self, cue_path, folder_path):
         """
@@ -960,28 +2114,23 @@ class AudioProcessor:
         if len(audio_files) != len(tracks):
             print(f'Warning: {len(audio_files)} files but {len(tracks)} tracks in CUE')
         
-        tagged_count = 0
-        
         # Match files to tracks (by index)
-        for i, file_path in enumerate(audio_files):
-            if i >= len(tracks):
-                break
-                
-            start, end, track_num, track_title, track_performer = tracks[i]
+        file_tags = {}
+        for file_path, track_data in zip(audio_files, tracks):
+            start, end, track_num, track_title, track_performer = track_data
             
-            tag_metadata = {
+            file_tags[file_path] = {
                 'title': track_title or f'Track {track_num}',
                 'artist': track_performer or metadata.get('album_artist', ''),
                 'album': metadata.get('album', ''),
                 'albumartist': metadata.get('album_artist', ''),
                 'tracknumber': str(track_num),
+                'tracktotal': str(len(tracks)),
                 'date': metadata.get('date', ''),
                 'genre': metadata.get('genre', '')
             }
-            
-            self.tag_file(file_path, tag_metadata)
-            tagged_count += 1
-            print(f'Re-tagged: {os.path.basename(file_path)}')
         
+        tagged_count = self.tag_files(file_tags)
+        print(f'Re-tagged {tagged_count} files in {folder_path}')
         return tagged_count
 
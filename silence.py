@@ -0,0 +1,305 @@
+import os
+import hashlib
+import subprocess
+import threading
+import time
+
+try:
+    # Optional: native PCM silence analysis (pip install numpy)
+    import numpy as np
+except ImportError:
+    np = None
+
+class SilenceAnalyzer:
+    """
+    Silence detection on decoded PCM read from a single ffmpeg stdout pipe.
+    Samples are processed in fixed-size blocks: per-window peak (or RMS) levels
+    are computed with NumPy and yielded block by block, so memory is bounded by
+    the block size regardless of file length, and the duration comes from the
+    sample count (no second ffmpeg launch). LoudnessEnvelope stores the levels.
+    """
+    def __init__(self, ffmpeg_path, sample_rate=44100, channels=2, window=0.01,
+                 block_seconds=10.0, mode="peak"):
+        self.ffmpeg_path = ffmpeg_path
+        self.sample_rate = sample_rate
+        self.channels = channels
+        self.window = window          # Level resolution in seconds
+        self.block_seconds = block_seconds
+        self.mode = mode              # "peak" (like silencedetect) or "rms"
+
+    @staticmethod
+    def available():
+        return np is not None
+
+    def decode_command(self, file_path):
+        return [
+            self.ffmpeg_path, "-v", "error",
+            "-i", file_path,
+            "-map", "0:a:0",
+            "-f", "f32le", "-ac", str(self.channels), "-ar", str(self.sample_rate),
+            "pipe:1"
+        ]
+
+    def iter_levels(self, file_path):
+        """
+        Yields per-window levels in dBFS as NumPy float32 arrays, block by block.
+        Raises RuntimeError if ffmpeg fails.
+        """
+        window_samples = max(1, int(round(self.window * self.sample_rate)))
+        windows_per_block = max(1, int(self.block_seconds / self.window))
+        frame_bytes = 4 * self.channels
+        block_bytes = windows_per_block * window_samples * frame_bytes
+        
+        proc = subprocess.Popen(self.decode_command(file_path), stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE, bufsize=block_bytes)
+        # stderr is drained on a side thread so a chatty ffmpeg never blocks on it
+        stderr_chunks = []
+        drain = threading.Thread(target=lambda: stderr_chunks.append(proc.stderr.read()), daemon=True)
+        drain.start()
+        
+        buffer = bytearray(block_bytes)
+        view = memoryview(buffer)
+        try:
+            while True:
+                filled = 0
+                while filled < block_bytes:
+                    n = proc.stdout.readinto(view[filled:])
+                    if not n:
+                        break
+                    filled += n
+                if filled == 0:
+                    break
+                
+                frames = filled // frame_bytes
+                samples = np.frombuffer(buffer, dtype='<f4', count=frames * self.channels)
+                samples = samples.reshape(frames, self.channels)
+                # The final block may end with a partial window
+                full = frames // window_samples
+                levels = self._window_levels(samples[:full * window_samples].reshape(full, window_samples, self.channels))
+                if frames % window_samples:
+                    tail = samples[full * window_samples:]
+                    levels = np.append(levels, self._window_levels(tail.reshape(1, -1, self.channels)))
+                yield levels, frames
+                
+                if filled < block_bytes:
+                    break
+        finally:
+            proc.stdout.close()
+            proc.wait()
+            drain.join()
+        
+        if proc.returncode != 0:
+            stderr = b"".join(c for c in stderr_chunks if c).decode('utf-8', errors='replace')
+            raise RuntimeError(f"ffmpeg decode failed: {stderr.strip()}")
+
+    def _window_levels(self, windows):
+        """ windows: (n_windows, window_samples, channels) -> dBFS per window """
+        if self.mode == "rms":
+            amplitude = np.sqrt(np.mean(np.square(windows, dtype=np.float32), axis=(1, 2)))
+        else:
+            amplitude = np.max(np.abs(windows), axis=(1, 2))
+        return (20.0 * np.log10(np.maximum(amplitude, 1e-10))).astype(np.float32)
+
+class SilenceRunDetector:
+    """
+    Streaming detector of silent runs over per-window levels. Transitions are
+    found per block with NumPy; only the open run is carried between blocks.
+    """
+    def __init__(self, window, db_threshold, min_duration):
+        self.window = window
+        self.db_threshold = db_threshold
+        self.min_windows = max(1, int(round(min_duration / window)))
+        self.position = 0          # Windows consumed so far
+        self.run_start = None      # Window index where the open silent run began
+        self.starts = []
+        self.ends = []
+
+    def feed(self, levels):
+        silent = (levels < self.db_threshold).astype(np.int8)
+        previous = 1 if self.run_start is not None else 0
+        edges = np.diff(np.concatenate(([previous], silent)))
+        run_starts = (np.flatnonzero(edges == 1) + self.position).tolist()
+        run_ends = (np.flatnonzero(edges == -1) + self.position).tolist()
+        
+        # Edges alternate; an open run from the previous block closes first
+        if self.run_start is not None and run_ends:
+            self._close(self.run_start, run_ends.pop(0))
+            self.run_start = None
+        for start, end in zip(run_starts, run_ends):
+            self._close(start, end)
+        if len(run_starts) > len(run_ends):
+            self.run_start = run_starts[-1]
+        
+        self.position += len(levels)
+
+    def _close(self, start, end):
+        if end - start >= self.min_windows:
+            self.starts.append(start * self.window)
+            self.ends.append(end * self.window)
+
+    def finish(self):
+        if self.run_start is not None and self.position - self.run_start >= self.min_windows:
+            self.starts.append(self.run_start * self.window)
+        return self.starts, self.ends
+
+class LoudnessEnvelope:
+    """
+    Compact per-window loudness (dBFS, one value per analyzer window) of a whole
+    file. Built from one decode and stored as float16 (~200 bytes per second of
+    audio), any number of (threshold, min_duration) combinations can be
+    evaluated against it in milliseconds.
+    """
+    # Default sweep grid for suggest()
+    THRESHOLDS = tuple(range(-70, -9, 2))
+    DURATIONS = (0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 4.0)
+    # On-disk cache bounds: unused envelopes expire, the least recently used go first beyond the size cap
+    CACHE_TTL = 90 * 24 * 3600
+    CACHE_MAX_BYTES = 256 * 1024 * 1024
+
+    def __init__(self, levels, window, duration):
+        self.levels = np.asarray(levels, dtype=np.float32)
+        self.window = window
+        self.duration = duration
+
+    @classmethod
+    def build(cls, analyzer, file_path):
+        blocks = []
+        total_frames = 0
+        for levels, frames in analyzer.iter_levels(file_path):
+            blocks.append(levels.astype(np.float16))
+            total_frames += frames
+        levels = np.concatenate(blocks) if blocks else np.zeros(0, dtype=np.float16)
+        return cls(levels, analyzer.window, total_frames / float(analyzer.sample_rate))
+
+    @classmethod
+    def load_or_build(cls, analyzer, file_path, cache_dir):
+        """
+        Loads the envelope from cache_dir (keyed by path + mtime + size + analyzer
+        settings) or builds it. Loading a cached envelope refreshes its mtime, which
+        prune_cache uses as the last access time.
+        """
+        st = os.stat(file_path)
+        key = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|{analyzer.window}|{analyzer.mode}|{analyzer.sample_rate}"
+        cache_path = os.path.join(cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest() + ".npz")
+        
+        if os.path.exists(cache_path):
+            try:
+                with np.load(cache_path) as data:
+                    envelope = cls(data['levels'], float(data['window']), float(data['duration']))
+                os.utime(cache_path)
+                return envelope
+            except Exception as e:
+                print(f"Envelope cache unreadable ({e}). Rebuilding...")
+        
+        envelope = cls.build(analyzer, file_path)
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            tmp_path = cache_path + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                np.savez(f, levels=envelope.levels.astype(np.float16),
+                         window=envelope.window, duration=envelope.duration)
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            print(f"Could not cache envelope: {e}")
+        cls.prune_cache(cache_dir)
+        return envelope
+
+    @classmethod
+    def prune_cache(cls, cache_dir):
+        """ Drops envelopes unused for CACHE_TTL, then the least recently used beyond CACHE_MAX_BYTES """
+        entries = []
+        try:
+            with os.scandir(cache_dir) as it:
+                for entry in it:
+                    # Leftover .tmp files of killed runs age out like envelopes
+                    if entry.name.endswith((".npz", ".npz.tmp")):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+        entries.sort()
+        cutoff = time.time() - cls.CACHE_TTL
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in entries:
+            if mtime >= cutoff and total <= cls.CACHE_MAX_BYTES:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+
+    def silences(self, db_threshold, min_duration):
+        """ Returns (silence_starts, silence_ends) with silencedetect semantics """
+        detector = SilenceRunDetector(self.window, db_threshold, min_duration)
+        detector.feed(self.levels)
+        return detector.finish()
+
+    def tracks(self, db_threshold, min_duration):
+        starts, ends = self.silences(db_threshold, min_duration)
+        return tracks_from_silences(starts, ends, self.duration)
+
+    def suggest(self, target_tracks, thresholds=None, durations=None):
+        """
+        Sweeps the grid and returns (db_threshold, min_duration, tracks) whose track
+        count is closest to target_tracks. Ties prefer the longest min_duration, then
+        the strictest (lowest) threshold - the least likely to split inside a song.
+        """
+        best = None
+        for min_duration in sorted(durations or self.DURATIONS, reverse=True):
+            for db_threshold in sorted(thresholds or self.THRESHOLDS):
+                tracks = self.tracks(db_threshold, min_duration)
+                miss = abs(len(tracks) - target_tracks)
+                if best is None or miss < best[0]:
+                    best = (miss, db_threshold, min_duration, tracks)
+                    if miss == 0:
+                        return best[1:]
+        return best[1:] if best else None
+
+def tracks_from_silences(silence_starts, silence_ends, duration):
+    """
+    Turns silence start/end times into (start, end) TRACK segments.
+    """
+    # Logic: Audio is what happens BETWEEN silence_end of previous and silence_start of next.
+    # First track starts at 0.0
+    
+    tracks = []
+    current_start = 0.0
+    
+    # Zip silences to find breaks
+    # We need to handle the case where silence_starts has one more item than ends (final silence) or vice versa
+    
+    # Simplified logic:
+    # Track 1: 0.0 -> silence_starts[0]
+    # Track 2: silence_ends[0] -> silence_starts[1]
+    # ...
+    
+    # Sort just in case
+    silence_starts = sorted(silence_starts)
+    silence_ends = sorted(silence_ends)
+    
+    # Filter out silence at very beginning (if any)
+    if silence_ends and silence_ends[0] < 1.0:
+        current_start = silence_ends[0]
+        silence_ends = silence_ends[1:]
+        if silence_starts and silence_starts[0] < 1.0:
+             silence_starts = silence_starts[1:]
+
+    count = min(len(silence_starts), len(silence_ends))
+    
+    for i in range(count):
+        gap_start = silence_starts[i]
+        gap_end = silence_ends[i]
+        
+        # Add track BEFORE this gap
+        if gap_start > current_start:
+            tracks.append((current_start, gap_start))
+        
+        # Next track starts after this gap
+        current_start = gap_end
+        
+    # Add final track (from last silence end to file duration)
+    if duration > current_start:
+          tracks.append((current_start, duration))
+          
+    return tracks
@@ -0,0 +1,153 @@
+import os
+import sys
+import json
+import shutil
+import threading
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+# Bundled external tools: name -> probe arguments (None = no probe, existence is enough;
+# sacd_extract has no version switch that exits 0)
+TOOLS = {
+    "ffmpeg.exe": ["-version"],
+    "fpcalc.exe": ["-version"],
+    "sacd_extract.exe": None
+}
+
+def bundled_tool_path(name):
+    """ PyInstaller: the unpack folder (_MEIPASS). Dev mode: ./bin next to the scripts """
+    if hasattr(sys, '_MEIPASS'):
+        return os.path.join(sys._MEIPASS, name)
+    if name in TOOLS:
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), "bin", name)
+    return os.path.join(os.path.abspath("."), name)
+
+def file_stamp(path):
+    """ [path, mtime_ns, size], with None for a missing file """
+    try:
+        st = os.stat(path)
+        return [path, st.st_mtime_ns, st.st_size]
+    except OSError:
+        return [path, None, None]
+
+class ToolRegistry:
+    """
+    Finds the external tools (bundled binary first, then the system PATH) and
+    what they can do, without a process launch per AudioProcessor.
+    Each tool is probed once: path, version line and, for ffmpeg, the available
+    filters. Results are kept in memory and in a small JSON file, keyed by the
+    mtime/size of every candidate binary: a warm start only stats files. When
+    probes are needed, all stale tools are probed at once in parallel.
+    Thread-safe.
+    """
+    def __init__(self, cache_path=None):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries = self._load()
+        # Tools whose entry was checked against the binaries in this process
+        self._checked = set()
+
+    def _load(self):
+        if not self.cache_path:
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            return data if isinstance(data, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def _save(self):
+        if not self.cache_path:
+            return
+        temp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(self._entries, f, indent=1)
+            os.replace(temp_path, self.cache_path)
+        except OSError as e:
+            print(f"Could not write tool cache: {e}")
+
+    @staticmethod
+    def candidates(name):
+        """ Stamps of the bundled binary and of the one on the system PATH, in order of preference """
+        paths = [bundled_tool_path(name)]
+        if not hasattr(sys, '_MEIPASS'):
+            system_path = shutil.which(os.path.splitext(name)[0])
+            if system_path and os.path.abspath(system_path) != os.path.abspath(paths[0]):
+                paths.append(system_path)
+        return [file_stamp(p) for p in paths]
+
+    def _is_fresh(self, name, candidates):
+        entry = self._entries.get(name)
+        return entry is not None and entry.get('candidates') == candidates
+
+    def info(self, name):
+        """ {'path', 'version', 'capabilities', 'candidates'} of a tool, probing it if needed """
+        with self._lock:
+            if name not in TOOLS:
+                return {'path': bundled_tool_path(name), 'version': None, 'capabilities': {}}
+            if name in self._checked:
+                return self._entries[name]
+            stale = {}
+            for tool in TOOLS:
+                candidates = self.candidates(tool)
+                if not self._is_fresh(tool, candidates):
+                    stale[tool] = candidates
+            if stale:
+                # One cold probe for every stale tool: they are launched side by side
+                with ThreadPoolExecutor(max_workers=len(stale)) as pool:
+                    for tool, entry in zip(stale, pool.map(self._probe, stale, stale.values())):
+                        self._entries[tool] = entry
+                self._save()
+            self._checked.update(TOOLS)
+            return self._entries[name]
+
+    def path(self, name):
+        return self.info(name)['path']
+
+    def capabilities(self, name):
+        return self.info(name).get('capabilities') or {}
+
+    def _probe(self, name, candidates):
+        """ First working candidate; falls back to the bundled path so callers fail with a clear error """
+        probe_args = TOOLS[name]
+        entry = {'path': candidates[0][0], 'version': None, 'capabilities': {}, 'candidates': candidates}
+        for i, (path, mtime_ns, _) in enumerate(candidates):
+            if mtime_ns is None:
+                continue
+            if probe_args is None:
+                entry['path'] = path
+                break
+            version = self._run(path, probe_args)
+            if version is None:
+                continue
+            entry['path'] = path
+            entry['version'] = version.strip().splitlines()[0] if version.strip() else ""
+            if name == "ffmpeg.exe":
+                entry['capabilities'] = self._ffmpeg_capabilities(path)
+            if i:
+                print(f"Using system {name}: {path}")
+            break
+        return entry
+
+    @staticmethod
+    def _run(path, args, timeout=5):
+        """ stdout of a successful run, else None """
+        try:
+            result = subprocess.run([path] + args, capture_output=True, timeout=timeout)
+        except (OSError, subprocess.SubprocessError):
+            return None
+        if result.returncode != 0:
+            return None
+        return (result.stdout or result.stderr).decode('utf-8', errors='replace')
+
+    def _ffmpeg_capabilities(self, path):
+        """ {'filters': [...]} from ffmpeg -filters """
+        return {'filters': self._parse_filters(self._run(path, ["-hide_banner", "-filters"]) or "")}
+
+    @staticmethod
+    def _parse_filters(text):
+        """ Names from 'ffmpeg -filters': ' ... asegment   A->N   ...' rows """
+        return [parts[1] for parts in map(str.split, text.splitlines())
+                if len(parts) >= 3 and len(parts[0]) == 3 and '->' in parts[2]]